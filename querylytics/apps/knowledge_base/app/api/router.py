@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException
+import json
+from functools import lru_cache
+
+from fastapi import APIRouter, Depends, HTTPException, Response
 from querylytics.shared.infrastructure.agent.special.doc_chat_agent import DocChatAgent, DocChatAgentConfig
 from querylytics.apps.knowledge_base.app.models.schemas import Document
+from querylytics.shared.infrastructure.utils.cache import TTLCache
 
 kb_router = APIRouter()
 
@@ -11,50 +15,62 @@ doc_chat_config = DocChatAgentConfig(
     collection_name="kb-store",
     storage_path=".chromadb/kb/"
 )
-doc_chat_agent = DocChatAgent(doc_chat_config)
+
+
+@lru_cache(maxsize=1)
+def get_doc_chat_agent() -> DocChatAgent:
+    """Create the shared DocChatAgent on first use instead of at import"""
+    return DocChatAgent(doc_chat_config)
+
+
+# Documents fetched by id, reused for a minute to skip repeated vector store lookups
+_document_cache = TTLCache(maxsize=1024, ttl=60)
+
+# Static payloads are encoded once at import instead of on every request
+_SEARCH_BODY = json.dumps({"message": [{'text': 'Russia, the largest country in the world, occupies one-tenth of all the land on Earth. It spans 11 time zones across two continents (Europe and Asia) and has coasts on three oceans (the Atlantic, Pacific, and Arctic).', 'metadata': {'id': 0}}]}).encode()
+_HEALTH_BODY = json.dumps({"status": "ok", "message": "Knowledge Base API is running"}).encode()
 
 
 @kb_router.get("/search")
 async def search_documents():
-    try:
-        # Use DocChatAgent to search
-        # results = doc_chat_agent.search(request.query)
-        
-        # Convert results to Document objects
-        documents = [{'text': 'Russia, the largest country in the world, occupies one-tenth of all the land on Earth. It spans 11 time zones across two continents (Europe and Asia) and has coasts on three oceans (the Atlantic, Pacific, and Arctic).', 'metadata': {'id': 0}}]
-        response = {"message": documents}
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Use DocChatAgent to search
+    # results = doc_chat_agent.search(request.query)
+
+    # Convert results to Document objects
+    return Response(content=_SEARCH_BODY, media_type="application/json")
 
 @kb_router.get("/documents/{doc_id}")
-async def get_document(doc_id: str) -> Document:
-    try:
-        # Query vector store for specific document
-        results = doc_chat_agent.search(f"id:{doc_id}")
-        if not results:
-            raise HTTPException(status_code=404, detail="Document not found")
-            
-        result = results[0]
-        return Document(
-            content=result["text"],
-            metadata=result.get("metadata", {})
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_document(
+    doc_id: str,
+    doc_chat_agent: DocChatAgent = Depends(get_doc_chat_agent)
+) -> Document:
+    document = _document_cache.get(doc_id)
+    if document is not None:
+        return document
+
+    # Query vector store for specific document
+    results = await doc_chat_agent.asearch(f"id:{doc_id}")
+    if not results:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    result = results[0]
+    document = Document(
+        content=result["text"],
+        metadata=result.get("metadata", {})
+    )
+    _document_cache.set(doc_id, document)
+    return document
 
 @kb_router.delete("/documents/{doc_id}")
 async def delete_document(doc_id: str):
-    try:
-        # Delete document logic would go here
-        # Note: Current ChromaDB implementation doesn't support deletion
-        return {"status": "deleted", "id": doc_id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Delete document logic would go here
+    # Note: Current ChromaDB implementation doesn't support deletion
+    _document_cache.pop(doc_id)
+    return {"status": "deleted", "id": doc_id}
 
 @kb_router.get("/health")
 async def health_check():
     """
     Simple health check endpoint
     """
-    return {"status": "ok", "message": "Knowledge Base API is running"}
\ No newline at end of file
+    return Response(content=_HEALTH_BODY, media_type="application/json")
\ No newline at end of file
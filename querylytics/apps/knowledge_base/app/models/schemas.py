@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any
 
+__all__ = ["Document", "SearchRequest", "SearchResponse"]
+
 class Document(BaseModel):
     """
     Represents a document in the knowledge base
@@ -9,13 +11,19 @@ class Document(BaseModel):
         content: The main text content of the document
         metadata: Additional metadata about the document (e.g., id, title, timestamp)
     """
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     content: str
-    metadata: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = Field(default_factory=dict)
 
 class SearchRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     query: str
     filters: Optional[dict] = None
     limit: Optional[int] = 10
 
 class SearchResponse(BaseModel):
-    results: List[dict] 
\ No newline at end of file
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    results: List[dict]
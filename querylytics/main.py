@@ -1,11 +1,7 @@
 import sys
-from pathlib import Path
 from colorama import init, Fore, Style
 
-# Add project root to Python path
-root_dir = Path(__file__).parent.parent
-sys.path.append(str(root_dir))
-
+import utils.path_setup  # noqa: F401  (must run before querylytics imports)
 import logging
 from querylytics.shared.infrastructure.agent.main_agent import MainAgent, MainAgentConfig
 from querylytics.shared.infrastructure.agent.special.retrieval_agent import RetrievalAgentConfig
@@ -19,8 +15,13 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# Initialize colorama
-init()
+# Only Windows consoles need colorama's ANSI translation; elsewhere stdout stays unwrapped
+init(wrap=sys.platform == "win32")
+
+# Colored prompts are formatted once rather than on every turn
+_YOU_PROMPT = f"\n{Fore.YELLOW}You: {Style.RESET_ALL}"
+_ANSWER_PREFIX = f"{Fore.GREEN}QueryLytics: "
+_ANSWER_SUFFIX = f"{Style.RESET_ALL}\n"
 
 def main():
     try:
@@ -46,14 +47,18 @@ def main():
         print(f"{Fore.GREEN}Ready to analyze your customer success data. How can I help? (type 'exit' to quit){Style.RESET_ALL}")
         
         while True:
-            user_input = input(f"\n{Fore.YELLOW}You: {Style.RESET_ALL}").strip()
+            user_input = input(_YOU_PROMPT).strip()
             if user_input.lower() == 'exit':
                 print(f"{Fore.GREEN}QueryLytics: Goodbye!{Style.RESET_ALL}")
                 break
                 
-            response = agent.handle_message(user_input)
-            print(f"{Fore.GREEN}QueryLytics: {response}{Style.RESET_ALL}")
-            print(f"[Debug] Current State: {agent.state}")
+            # Stream the answer so the first tokens show up as soon as they arrive
+            sys.stdout.write(_ANSWER_PREFIX)
+            for piece in agent.handle_message_stream(user_input):
+                sys.stdout.write(piece)
+                sys.stdout.flush()
+            sys.stdout.write(_ANSWER_SUFFIX)
+            logger.debug("Current state: %s", agent.state)
 
     except Exception as e:
         logger.error("Error in main: %s", str(e))
@@ -1,17 +1,34 @@
+import logging
+import os
 import sys
-from pathlib import Path
-from fastapi import FastAPI
-from querylytics.apps.knowledge_base.app.api.router import kb_router
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 
-# Add project root to Python path
-root_dir = Path(__file__).parent.parent
-sys.path.extend([
-    str(root_dir),
-    str(root_dir / "apps"),
-    str(root_dir / "shared")
-])
+import utils.path_setup  # noqa: F401  (must run before querylytics imports)
+from querylytics.apps.knowledge_base.app.api.router import get_doc_chat_agent, kb_router
+
+logging.basicConfig(level=logging.INFO)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the vector store and LLM client once the worker is up, not at import
+    app.state.doc_chat_agent = get_doc_chat_agent()
+    yield
+
+
+app = FastAPI(
+    title="Knowledge Base API",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
+    return ORJSONResponse({"detail": str(exc)}, status_code=500)
 
-app = FastAPI(title="Knowledge Base API")
 
 # Mount only KB app
 app.include_router(kb_router, prefix="/kb")
@@ -19,5 +36,14 @@ app.include_router(kb_router, prefix="/kb")
 if __name__ == "__main__":
     import uvicorn
 
-    # Simplified to run single server
-    uvicorn.run("run:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # Auto-reload is for local development only and cannot run multiple workers
+    reload = os.getenv("KB_API_RELOAD", "").lower() in ("1", "true", "yes")
+    uvicorn.run(
+        "run:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=reload,
+        workers=None if reload else os.cpu_count(),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    )
@@ -1,7 +1,14 @@
+import asyncio
+import json
 import logging
+import re
+import sys
+import threading
 from abc import ABC
-from typing import Optional, List, Dict, Type, Any
-from pydantic import BaseModel
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import Deque, Iterator, Optional, List, Dict, Set, Tuple, Type, Any
+from pydantic import BaseModel, Field
 from enum import Enum
 from dataclasses import dataclass, field
 from colorama import Fore, Style, init
@@ -11,10 +18,35 @@ from querylytics.shared.infrastructure.language_models.openai_gpt import OpenAIG
 from querylytics.shared.infrastructure.vector_store.base import VectorStoreConfig, VectorStore
 from querylytics.shared.infrastructure.agent.tool_message import ToolMessage
 
-logging.basicConfig(level=logging.INFO)
+__all__ = ["Agent", "AgentConfig", "AgentContext", "AgentState"]
+
 logger = logging.getLogger(__name__)
 
-init(autoreset=True)  # Initialize colorama
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+# Phrases that mark a tool result as a failure rather than an answer
+_ERROR_RESULT = re.compile(r"error|not found|no relevant|couldn't find|not configured", re.IGNORECASE)
+
+
+class _StripAnsiFilter(logging.Filter):
+    """Remove color codes from records when output is not a terminal"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str):
+            record.msg = _ANSI_ESCAPE.sub("", record.msg)
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                _ANSI_ESCAPE.sub("", arg) if isinstance(arg, str) else arg
+                for arg in record.args
+            )
+        return True
+
+
+if not sys.stdout.isatty():
+    logger.addFilter(_StripAnsiFilter())
+
+# Only Windows consoles need colorama's ANSI translation; elsewhere stdout stays unwrapped
+init(wrap=sys.platform == "win32")
 
 class AgentState(str, Enum):
     """Agent states as an Enum"""
@@ -28,20 +60,40 @@ class AgentState(str, Enum):
     PROBING = "probing"
     NOTIFYING = "notifying"
 
+MAX_HISTORY_MESSAGES = 400  # Oldest messages are dropped beyond this
+
+_COMPACTION_PROMPT = (
+    "Summarize the following conversation in a few sentences, keeping any facts, "
+    "decisions and open questions needed to continue it:\n\n"
+)
+
 @dataclass
 class AgentContext:
     current_tool: Optional[ToolMessage] = None
     tool_history: List[ToolMessage] = field(default_factory=list)
-    conversation_history: List[tuple] = field(default_factory=list)
+    # Conversation history kept as parallel role/content columns rather than one tuple per message
+    history_roles: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_HISTORY_MESSAGES))
+    history_contents: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_HISTORY_MESSAGES))
     error_count: int = 0
     capabilities: List[str] = field(default_factory=list)
 
+    @property
+    def conversation_history(self) -> List[Tuple[str, str]]:
+        """Snapshot of the history as (role, content) pairs"""
+        return list(zip(self.history_roles, self.history_contents))
+
 class AgentConfig(BaseModel):
     name: str = "LLM-Agent"
     debug: bool = False
-    llm: Optional[LLMConfig] = OpenAIGPTConfig()
+    llm: Optional[LLMConfig] = Field(default_factory=OpenAIGPTConfig)
     vecdb_config: Optional[VectorStoreConfig] = None
     capabilities: List[str] = []
+    response_cache_size: int = 1000  # Cached query classifications; 0 disables caching
+    response_cache_ttl: float = 300.0  # Seconds a cached classification stays valid
+    max_history_turns: int = 200  # User/assistant turns kept; older ones are dropped
+    history_compaction_chars: Optional[int] = None  # Summarize old turns once history exceeds this
+    history_compaction_turns: int = 20  # Oldest turns folded into one summary per compaction
+    tool_concurrency: int = 4  # Tool calls one agent runs at once when trying several
 
 class Agent(ABC):
     # State colors mapping
@@ -72,10 +124,26 @@ class Agent(ABC):
         self.config = config
         self.llm = LanguageModel.create(config.llm)
         self.tools: Dict[str, Type[ToolMessage]] = {}
+        # Derived from self.tools once per registration instead of on every message
+        self._tool_request_types: Dict[str, Type[ToolMessage]] = {}
+        self._tool_context = ""
+        self._tool_request_pattern: Optional[re.Pattern] = None
+        self._tool_name_pattern: Optional[re.Pattern] = None
+        self._tool_handlers: Dict[Type[ToolMessage], Any] = {}
         self.vecdb = self._init_vecdb(config.vecdb_config)
         self._state = AgentState.IDLE
-        self.context = AgentContext()
+        self.context = AgentContext(
+            history_roles=deque(maxlen=2 * config.max_history_turns),
+            history_contents=deque(maxlen=2 * config.max_history_turns)
+        )
+        self._compacting = False
         self.context.capabilities = config.capabilities
+        # Tool handlers run concurrently and may all record exchanges
+        self._context_lock = threading.Lock()
+        # Owned by the agent, so tool calls left running by an early answer stay bounded
+        self._tool_executor = ThreadPoolExecutor(
+            max_workers=config.tool_concurrency, thread_name_prefix=f"{config.name}-tools"
+        )
 
     @property
     def state(self) -> AgentState:
@@ -89,18 +157,21 @@ class Agent(ABC):
         
         old_state = self._state
         self._state = new_state
-        
-        # Get colors and emojis for old and new states
-        old_color = self.STATE_COLORS.get(old_state, Fore.WHITE)
-        new_color = self.STATE_COLORS.get(new_state, Fore.WHITE)
-        old_emoji = self.STATE_EMOJI.get(old_state, "")
-        new_emoji = self.STATE_EMOJI.get(new_state, "")
+        if not logger.isEnabledFor(logging.INFO):
+            return
         
         # Log the transition with colors and emojis
         logger.info(
-            f"{old_color}{old_emoji} {self.config.name}: "
-            f"{old_state.value}{Style.RESET_ALL} → "
-            f"{new_color}{new_emoji} {new_state.value}"
+            "%s%s %s: %s%s → %s%s %s%s",
+            self.STATE_COLORS.get(old_state, Fore.WHITE),
+            self.STATE_EMOJI.get(old_state, ""),
+            self.config.name,
+            old_state.value,
+            Style.RESET_ALL,
+            self.STATE_COLORS.get(new_state, Fore.WHITE),
+            self.STATE_EMOJI.get(new_state, ""),
+            new_state.value,
+            Style.RESET_ALL
         )
 
     def _init_vecdb(self, vecdb_config: Optional[VectorStoreConfig]) -> Optional[VectorStore]:
@@ -110,21 +181,37 @@ class Agent(ABC):
 
     def register_tool(self, tool_class: Type[ToolMessage]) -> None:
         """Register a tool with the agent"""
-        if self.state != AgentState.IDLE:
+        if self.state is not AgentState.IDLE:
             logger.warning("Registering tool while not IDLE")
         
-        try:
-            tool_name = tool_class.default_value("request")
-            if not tool_name:
-                tool_name = tool_class.__name__.lower()
-                logger.warning(f"Tool {tool_class.__name__} has no request value, using class name")
-        except Exception as e:
-            tool_name = tool_class.__name__.lower()
-            logger.error(f"Error getting request type for {tool_class.__name__}: {e}")
+        # Tools are named after their class: prompts refer to them that way and
+        # handlers are the agent methods of the same name
+        tool_name = tool_class.__name__.lower()
         
-        logger.info(f"Registering tool {tool_class.__name__} with name '{tool_name}'")
+        logger.info("Registering tool %s with name '%s'", tool_class.__name__, tool_name)
         self.tools[tool_name] = tool_class
-        logger.info(f"Current tools: {list(self.tools.keys())}")
+        self._tool_request_types[tool_class.get_request_type().lower()] = tool_class
+        # Handlers are methods named after the tool class, resolved once here rather than per try
+        self._tool_handlers[tool_class] = getattr(self, tool_class.__name__.lower(), None)
+        self._tool_context = "\n".join(
+            f"- {name}: {(tool.__doc__ or 'No description available').strip()}"
+            for name, tool in self.tools.items()
+        )
+        self._tool_request_pattern = self._compile_names(self._tool_request_types)
+        self._tool_name_pattern = self._compile_names(self.tools)
+        logger.info("Current tools: %s", list(self.tools.keys()))
+
+    @staticmethod
+    def _compile_names(names) -> Optional[re.Pattern]:
+        """Compile names into one case-insensitive alternation of whole words, longest first
+
+        The word boundaries keep a name from matching inside a longer word, so a
+        tool whose name is part of another tool's name is only found on its own.
+        """
+        if not names:
+            return None
+        alternatives = sorted((re.escape(name) for name in names), key=len, reverse=True)
+        return re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)", re.IGNORECASE)
 
     def handle_message(self, message: str) -> str:
         """Main message handling flow with color indicators"""
@@ -132,12 +219,20 @@ class Agent(ABC):
             self.transition_to(AgentState.PROCESSING)
             
             # Get LLM's initial response
-            logger.info(f"{Fore.YELLOW}⚡ Processing message with LLM...{Style.RESET_ALL}")
+            logger.debug(f"{Fore.YELLOW}⚡ Processing message with LLM...{Style.RESET_ALL}")
             llm_response = self.llm_response(message)
             
-            # Try to execute any tools
-            logger.info(f"{Fore.BLUE}🔧 Checking for tool execution...{Style.RESET_ALL}")
-            tool_result = self._execute_tools(llm_response)
+            # Run every tool the response mentions at once and answer from all their results
+            logger.debug(f"{Fore.BLUE}🔧 Checking for tool execution...{Style.RESET_ALL}")
+            tried: Set[str] = set()
+            tool_results = self._execute_mentioned_tools(llm_response, tried)
+            if tool_results:
+                logger.info(f"{Fore.GREEN}✅ Tool execution successful{Style.RESET_ALL}")
+                return self.llm_response(f"Tool results: {json.dumps(tool_results, default=str)}")
+
+            # Otherwise fall back to the first tool that yields a valid result; tools
+            # that already failed above aren't run a second time
+            tool_result = self._execute_tools(llm_response, exclude=tried)
             if tool_result:
                 logger.info(f"{Fore.GREEN}✅ Tool execution successful{Style.RESET_ALL}")
                 return self.llm_response(f"Tool result: {tool_result}")
@@ -145,30 +240,86 @@ class Agent(ABC):
             return llm_response
             
         except Exception as e:
-            logger.error(f"{Fore.RED}❌ Error in message handling: {str(e)}{Style.RESET_ALL}")
+            logger.error(f"{Fore.RED}❌ Error in message handling: %s{Style.RESET_ALL}", e)
             self.transition_to(AgentState.ERROR)
             return f"Error in message handling: {str(e)}"
 
-    def _execute_tools(self, llm_response: str) -> Optional[str]:
-        """Tool execution with color indicators"""
+    def handle_message_stream(self, message: str) -> Iterator[str]:
+        """Stream the response to a message; agents that can stream override this"""
+        yield self.handle_message(message)
+
+    def _execute_mentioned_tools(self, llm_response: str, tried: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Run every tool named in the response concurrently, keyed by tool name
+
+        The names of the tools run are added to `tried`.
+        """
+        if self._tool_name_pattern is None:
+            return {}
+        mentioned = {match.group(0).lower() for match in self._tool_name_pattern.finditer(llm_response)}
+        candidates = {name: tool for name, tool in self.tools.items() if name.lower() in mentioned}
+        if len(candidates) < 2:
+            # A single tool is handled by the first-match path
+            return {}
+
+        if tried is not None:
+            tried.update(candidates)
+        futures = {
+            name: self._tool_executor.submit(self._try_tool, llm_response, tool_class)
+            for name, tool_class in candidates.items()
+        }
+        results = {}
+        for name, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning("Tool %s failed: %s", name, e)
+                continue
+            if result:
+                results[name] = result
+        return results
+
+    def _execute_tools(self, llm_response: str, exclude: Optional[Set[str]] = None) -> Optional[str]:
+        """Tool execution with color indicators; tools named in `exclude` are skipped"""
         try:
+            exclude = exclude or set()
             specific_tool = self._get_specific_tool(llm_response)
+            if specific_tool is not None and specific_tool.__name__.lower() in exclude:
+                specific_tool = None
             if specific_tool:
-                logger.info(f"{Fore.CYAN}🔧 Using tool: {specific_tool.__name__}{Style.RESET_ALL}")
+                logger.info(f"{Fore.CYAN}🔧 Using tool: %s{Style.RESET_ALL}", specific_tool.__name__)
                 result = self._try_tool(llm_response, specific_tool)
                 if result:
                     return result
 
-            for tool_class in self.tools.values():
-                logger.info(f"{Fore.CYAN}🔧 Trying tool: {tool_class.__name__}{Style.RESET_ALL}")
-                result = self._try_tool(llm_response, tool_class)
-                if result:
-                    return result
-            
-            return None
-            
+            candidates = [
+                t for name, t in self.tools.items()
+                if t is not specific_tool and name not in exclude
+            ]
+            if not candidates:
+                return None
+            if len(candidates) == 1:
+                return self._try_tool(llm_response, candidates[0])
+
+            # Tools may each make an LLM round-trip, so they run at once, but the
+            # result is still the first valid one in registration order
+            futures = []
+            try:
+                for tool_class in candidates:
+                    logger.info(f"{Fore.CYAN}🔧 Trying tool: %s{Style.RESET_ALL}", tool_class.__name__)
+                    futures.append(self._tool_executor.submit(self._try_tool, llm_response, tool_class))
+                for future in futures:
+                    result = future.result()
+                    if result:
+                        return result
+                return None
+            finally:
+                # Lower-priority attempts not yet started are dropped; a running tool
+                # call can't be interrupted, so it finishes on the agent's pool
+                for future in futures:
+                    future.cancel()
+
         except Exception as e:
-            logger.warning(f"{Fore.RED}❌ Error in tool execution: {e}{Style.RESET_ALL}")
+            logger.warning(f"{Fore.RED}❌ Error in tool execution: %s{Style.RESET_ALL}", e)
             return None
 
     def llm_response(self, message: str) -> str:
@@ -184,18 +335,190 @@ class Agent(ABC):
             if not llm_result:
                 logger.warning("No response from LLM")
                 return "Failed to get LLM response"
-                
+
             # Extract message from response dictionary
             response_text = llm_result.get("message", "No response generated")
-            
-            # Update conversation history
-            self.context.conversation_history.append(("user", message))
-            self.context.conversation_history.append(("assistant", response_text))
+
+            self._record_exchange(message, response_text)
             
             return response_text
             
         except Exception as e:
-            logger.error(f"Error in llm_response: {e}")
+            logger.error("Error in llm_response: %s", e)
+            return f"Error getting LLM response: {str(e)}"
+
+    def llm_response_stream(self, message: str) -> Iterator[str]:
+        """Streaming llm_response: yields text as it arrives, then records the full answer"""
+        try:
+            if not self.llm:
+                logger.warning("LLM not configured")
+                yield "LLM not configured."
+                return
+
+            augmented_message = f"{message}\n\nAvailable tools:\n{self.get_tool_context()}"
+            pieces = []
+            for piece in self.llm.generate_stream(augmented_message):
+                pieces.append(piece)
+                yield piece
+            response_text = "".join(pieces)
+
+            self._record_exchange(message, response_text)
+
+        except Exception as e:
+            logger.error("Error in llm_response_stream: %s", e)
+            yield f"Error getting LLM response: {str(e)}"
+
+    def _record_exchange(self, message: str, response_text: str) -> None:
+        """Append a user/assistant turn to the conversation history"""
+        self._append_exchange(message, response_text)
+        self._maybe_compact()
+
+    async def _arecord_exchange(self, message: str, response_text: str) -> None:
+        """_record_exchange for async callers; a compaction awaits its summary"""
+        self._append_exchange(message, response_text)
+        await self._amaybe_compact()
+
+    def _append_exchange(self, message: str, response_text: str) -> None:
+        with self._context_lock:
+            self.context.history_roles.extend(("user", "assistant"))
+            self.context.history_contents.extend((message, response_text))
+
+    def _maybe_compact(self) -> None:
+        """
+        Fold the oldest turns into a single summary message once the history
+        grows past config.history_compaction_chars. The summary takes their
+        place at the front, so the rest of the history keeps its order.
+        """
+        pending = self._start_compaction()
+        if pending is None:
+            return
+        try:
+            summary = self.llm.generate(_COMPACTION_PROMPT + pending[1]).get("message")
+            self._finish_compaction(pending[0], summary)
+        except Exception as e:
+            logger.warning("History compaction failed: %s", e)
+        finally:
+            self._compacting = False
+
+    async def _amaybe_compact(self) -> None:
+        """Async _maybe_compact: the summary is awaited instead of blocking the loop"""
+        pending = self._start_compaction()
+        if pending is None:
+            return
+        try:
+            summary = (await self.llm.agenerate(_COMPACTION_PROMPT + pending[1])).get("message")
+            self._finish_compaction(pending[0], summary)
+        except Exception as e:
+            logger.warning("History compaction failed: %s", e)
+        finally:
+            self._compacting = False
+
+    def _start_compaction(self) -> Optional[Tuple[List[str], str]]:
+        """The oldest turns' contents and their transcript if a compaction is due
+
+        Marks a compaction as running; the caller must reset _compacting.
+        """
+        limit = self.config.history_compaction_chars
+        if not limit or not self.llm:
+            return None
+
+        count = 2 * self.config.history_compaction_turns
+        with self._context_lock:
+            contents = self.context.history_contents
+            if self._compacting or len(contents) <= count or sum(map(len, contents)) <= limit:
+                return None
+            self._compacting = True
+            old_roles = list(self.context.history_roles)[:count]
+            old_contents = list(contents)[:count]
+        transcript = "\n".join(f"{role}: {content}" for role, content in zip(old_roles, old_contents))
+        return old_contents, transcript
+
+    def _finish_compaction(self, old_contents: List[str], summary: Optional[str]) -> None:
+        """Replace the summarized turns with the summary"""
+        if not summary or summary.startswith("Error:"):
+            return
+        count = len(old_contents)
+        with self._context_lock:
+            roles, contents = self.context.history_roles, self.context.history_contents
+            # Skip if the oldest turns changed while the summary was generated
+            if list(contents)[:count] != old_contents:
+                return
+            self.context.history_roles = deque(
+                ["system"] + list(roles)[count:], maxlen=roles.maxlen
+            )
+            self.context.history_contents = deque(
+                [f"Summary of earlier conversation: {summary}"] + list(contents)[count:],
+                maxlen=contents.maxlen
+            )
+        logger.info("Compacted %d history messages into a summary", count)
+
+    async def allm_response(self, message: str) -> str:
+        """Async variant of llm_response that awaits the LLM without blocking the loop"""
+        try:
+            if not self.llm:
+                logger.warning("LLM not configured")
+                return "LLM not configured."
+
+            tool_context = self.get_tool_context()
+            augmented_message = f"{message}\n\nAvailable tools:\n{tool_context}"
+            llm_result = await self.llm.agenerate(augmented_message)
+            if not llm_result:
+                logger.warning("No response from LLM")
+                return "Failed to get LLM response"
+
+            response_text = llm_result.get("message", "No response generated")
+
+            await self._arecord_exchange(message, response_text)
+
+            return response_text
+
+        except Exception as e:
+            logger.error("Error in allm_response: %s", e)
+            return f"Error getting LLM response: {str(e)}"
+
+    async def respond(self, prompt: str, k: int = 5) -> str:
+        """
+        Answer a prompt grounded in the agent's vector store.
+
+        Retrieval and tool-context assembly run concurrently; the LLM is
+        only called once both are ready.
+        """
+        try:
+            if not self.llm:
+                logger.warning("LLM not configured")
+                return "LLM not configured."
+
+            loop = asyncio.get_running_loop()
+            retrieval = (
+                loop.run_in_executor(None, self.vecdb.query, prompt, k)
+                if self.vecdb is not None and hasattr(self.vecdb, "query")
+                else asyncio.sleep(0, result=[])
+            )
+            results, tool_context = await asyncio.gather(
+                retrieval,
+                loop.run_in_executor(None, self.get_tool_context)
+            )
+
+            # Static parts go first, so prompts share a cacheable prefix; retrieved
+            # chunks keep the store's best-first order
+            context = "\n\n".join(result["text"] for result in results)
+            augmented_message = f"Available tools:\n{tool_context}\n\n"
+            if context:
+                augmented_message += f"Context:\n{context}\n\n"
+            augmented_message += f"Question: {prompt}"
+            llm_result = await self.llm.agenerate(augmented_message)
+            if not llm_result:
+                logger.warning("No response from LLM")
+                return "Failed to get LLM response"
+
+            response_text = llm_result.get("message", "No response generated")
+
+            await self._arecord_exchange(prompt, response_text)
+
+            return response_text
+
+        except Exception as e:
+            logger.error("Error in respond: %s", e)
             return f"Error getting LLM response: {str(e)}"
 
     def parse_tools(self, llm_response: str) -> List[ToolMessage]:
@@ -203,16 +526,21 @@ class Agent(ABC):
         if not llm_response:
             return []
         
+        if self._tool_name_pattern is None:
+            return []
+
+        # One pass over the response finds every mentioned tool
+        mentioned = {match.group(0).lower() for match in self._tool_name_pattern.finditer(llm_response)}
         tool_requests = []
         
         for tool_name, tool_class in self.tools.items():
-            if tool_name.lower() in llm_response.lower():
+            if tool_name.lower() in mentioned:
                 try:
                     params = self._extract_tool_params(llm_response, tool_class)
                     tool = tool_class(**params)
                     tool_requests.append(tool)
                 except Exception as e:
-                    logger.warning(f"Failed to parse tool {tool_name}: {e}")
+                    logger.warning("Failed to parse tool %s: %s", tool_name, e)
             
         return tool_requests
 
@@ -224,14 +552,7 @@ class Agent(ABC):
 
     def get_tool_context(self) -> str:
         """Get formatted list of available tools"""
-        tool_descriptions = []
-        logger.info(f"Getting tool context for {len(self.tools)} tools")
-        for name, tool in self.tools.items():
-            desc = tool.__doc__ or "No description available"
-            desc = desc.strip()  # Remove any extra whitespace
-            tool_descriptions.append(f"- {name}: {desc}")
-            logger.info(f"Added tool to context: {name}")
-        return "\n".join(tool_descriptions)
+        return self._tool_context
 
     def get_state_info(self) -> dict:
         """Get current state information when needed"""
@@ -249,17 +570,14 @@ class Agent(ABC):
         """Add a new capability to the agent"""
         if capability not in self.context.capabilities:
             self.context.capabilities.append(capability)
-            logger.info(f"Added capability: {capability}")
+            logger.info("Added capability: %s", capability)
     
     def _get_specific_tool(self, message: str) -> Optional[Type[ToolMessage]]:
         """Check if message specifically requests a tool"""
-        message_lower = message.lower()
-        for tool_class in self.tools.values():
-            # Get the request type from the tool class
-            tool_name = tool_class.get_request_type().lower()
-            if tool_name in message_lower:
-                return tool_class
-        return None
+        if self._tool_request_pattern is None:
+            return None
+        match = self._tool_request_pattern.search(message)
+        return self._tool_request_types[match.group(0).lower()] if match else None
 
     def _try_tool(self, message: str, tool_class: Type[ToolMessage]) -> Optional[str]:
         """Try using a specific tool"""
@@ -267,11 +585,10 @@ class Agent(ABC):
             params = self._extract_tool_params(message, tool_class)
             tool = tool_class(**params)
             
-            handler_name = tool_class.__name__.lower()
-            handler = getattr(self, handler_name, None)
+            handler = self._tool_handlers.get(tool_class)
             
             if not handler:
-                logger.warning(f"No handler for {tool_class.__name__}")
+                logger.warning("No handler for %s", tool_class.__name__)
                 return None
             
             # If tool requires function calling, use that format
@@ -290,13 +607,13 @@ class Agent(ABC):
                 result = handler(tool)
                 
             if self._is_valid_result(result):
-                logger.info(f"Successfully got result from {tool_class.__name__}")
+                logger.info("Successfully got result from %s", tool_class.__name__)
                 return result
             
             return None
             
         except Exception as e:
-            logger.warning(f"Error executing {tool_class.__name__}: {e}")
+            logger.warning("Error executing %s: %s", tool_class.__name__, e)
             return None
 
     def _is_valid_result(self, result: Any) -> bool:
@@ -305,14 +622,7 @@ class Agent(ABC):
             return False
         
         if isinstance(result, str):
-            error_patterns = [
-                "error",
-                "not found",
-                "no relevant",
-                "couldn't find",
-                "not configured"
-            ]
-            return not any(pattern in result.lower() for pattern in error_patterns)
+            return _ERROR_RESULT.search(result) is None
         
         return bool(result)
     
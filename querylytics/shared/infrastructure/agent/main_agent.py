@@ -1,29 +1,115 @@
-from pydantic import BaseModel
-from typing import Optional
+from functools import cached_property
+from pydantic import Field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+import asyncio
+import json
 import logging
+import textwrap
+
+import tiktoken
 
 
 from querylytics.shared.infrastructure.agent.base import Agent, AgentConfig, AgentState
 from querylytics.shared.infrastructure.agent.special.retrieval_agent import RetrievalAgent, RetrievalAgentConfig
 from querylytics.shared.infrastructure.agent.special.probing_agent import ProbingAgent, ProbingAgentConfig
 from querylytics.shared.infrastructure.agent.special.notification_agent import NotificationAgent, NotificationAgentConfig
+from querylytics.shared.infrastructure.agent.query_classifier import EmbeddingQueryClassifier
+from querylytics.shared.infrastructure.embedding_models.models import OpenAIEmbeddings, OpenAIEmbeddingsConfig, get_encoder
+from querylytics.shared.infrastructure.language_models.batching import BatchingOpenAIGPT
+from querylytics.shared.infrastructure.language_models.config.base import LLMConfig, LanguageModel
+from querylytics.shared.infrastructure.language_models.openai_gpt import OpenAIChatModel, OpenAIGPTConfig
+from querylytics.shared.infrastructure.language_models.semantic_cache import SemanticCacheConfig
+from querylytics.shared.infrastructure.utils.cache import TTLCache
+
 
 
+from orjson import loads as _json_loads
 
 logger = logging.getLogger(__name__)
 
+# Static instructions are sent as their own leading system message so the
+# provider can reuse the cached prefix; only the user message varies per query
+CLASSIFICATION_PROMPT = """\
+Classify the user's query as either 'general_chat' or 'needs_retrieval':
+
+general_chat: General conversation, greetings, opinions, or simple questions
+needs_retrieval: Questions requiring specific information, facts, or detailed knowledge
+
+Reply with the classification only."""
+
+ROUTING_PROMPT = """\
+Call route for the user's query. Set route to 'general_chat' for general conversation,
+greetings, opinions, or simple questions, and give your reply as answer. Set route to
+'needs_retrieval' for questions requiring specific information, facts, or detailed
+knowledge, and leave answer empty."""
+
+# Built once so every routing call sends the identical tool definition
+_ROUTE_FUNCTIONS = [{
+    "name": "route",
+    "description": "Route the query and, for general chat, answer it",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "route": {"type": "string", "enum": ["general_chat", "needs_retrieval"]},
+            "answer": {"type": "string"}
+        },
+        "required": ["route"]
+    }
+}]
+_FORCE_ROUTE_CALL = {"name": "route"}
+
+FEEDBACK_SATISFIED = frozenset({"yes", "good", "correct", "perfect", "thanks", "ok", "okay"})
+FEEDBACK_UNSATISFIED = frozenset({"no", "wrong", "incorrect", "bad", "not helpful"})
+FEEDBACK_WORDS = FEEDBACK_SATISFIED | FEEDBACK_UNSATISFIED
+# Longer replies still count as unsatisfied when they contain one of these
+FEEDBACK_UNSATISFIED_PHRASES = ("not helpful", "not good", "doesn't help", "not what i")
+
 class MainAgentConfig(AgentConfig):
     """Configuration for MainAgent"""
     retrieval_config: Optional[RetrievalAgentConfig] = None
-    probing_config: Optional[ProbingAgentConfig] = ProbingAgentConfig()
+    probing_config: Optional[ProbingAgentConfig] = Field(default_factory=ProbingAgentConfig)
     notification_config: Optional[NotificationAgentConfig] = None
-    system_message: str = """
+    # Dedented so the indentation isn't sent, and billed, as prompt tokens
+    system_message: str = textwrap.dedent("""
     You are a helpful assistant that can:
     1. Answer questions directly
     2. Use retrieval for detailed information
     3. Handle feedback and improve responses
-    """
+    """).strip()
     max_probe_attempts: int = 3
+    # A small model is plenty for the binary query classification; None reuses llm.
+    # Its semantic cache answers paraphrases of already-classified queries
+    classifier_llm: Optional[LLMConfig] = Field(
+        default_factory=lambda: OpenAIGPTConfig(
+            chat_model=OpenAIChatModel.GPT4o_MINI,
+            temperature=0,
+            semantic_cache=SemanticCacheConfig(enabled=True)
+        )
+    )
+    classification_batch_interval_ms: float = 20  # Window for coalescing concurrent aclassify_query calls
+    # Classify and answer general chat in one llm function call instead of a
+    # classifier call followed by a chat call
+    single_call_routing: bool = False
+    # ahandle_message starts retrieval while the query is still being classified,
+    # cancelling it for general chat. Saves the classification round trip on
+    # retrieval queries, but a cancelled retrieval still finishes any search
+    # already running in a worker thread, so chat queries pay for that work
+    speculative_retrieval: bool = False
+    # ahandle_message also drafts the general chat reply on the main llm while the
+    # query is classified. Saves a round trip on general chat, but every retrieval
+    # query pays for a full discarded completion
+    speculative_chat_draft: bool = False
+    classification_batch_size: int = 16
+    # Only the head of a query is sent for classification; a pasted document
+    # shouldn't cost its full length in classifier tokens
+    max_classification_query_tokens: int = 512
+    # Embedding model for a local logistic-regression classifier tried before the
+    # classifier llm; None disables it. Only queries it is confident about skip the llm
+    local_classifier_embedding_model: Optional[str] = None
+    local_classifier_confidence: float = 0.8
+    # (query, "general_chat" | "needs_retrieval") pairs it is fit on, ideally a hundred
+    # or more of each drawn from real traffic; the classifier stays off without them
+    local_classifier_examples: List[Tuple[str, str]] = Field(default_factory=list)
 
 class MainAgent(Agent):
     def __init__(self, config: MainAgentConfig):
@@ -38,7 +124,6 @@ class MainAgent(Agent):
             )
         else:
             self.retrieval_config = config.retrieval_config
-        self.retrieval_agent = RetrievalAgent(self.retrieval_config)
         
         if not config.probing_config:
             logger.warning("No probing config provided, using default")
@@ -49,7 +134,6 @@ class MainAgent(Agent):
             )
         else:
             self.probing_config = config.probing_config
-        self.probing_agent = ProbingAgent(self.probing_config)
         
         if not config.notification_config:
             logger.warning("No notification config provided, using default")
@@ -64,113 +148,396 @@ class MainAgent(Agent):
         self.context.current_query = None
         self.context.current_answer = None
         self.context.probe_count = 0
+        # Classifications keyed by normalized query; the answer space is tiny so hits are common
+        self._classification_cache = TTLCache(
+            maxsize=config.response_cache_size,
+            ttl=config.response_cache_ttl
+        )
+        self.classifier_llm = (
+            LanguageModel.create(config.classifier_llm) if config.classifier_llm else self.llm
+        )
+        self._classification_batcher = BatchingOpenAIGPT(
+            self.classifier_llm,
+            flush_interval_ms=config.classification_batch_interval_ms,
+            max_batch_size=config.classification_batch_size
+        )
+        self._local_classifier: Optional[EmbeddingQueryClassifier] = None
+        if config.local_classifier_embedding_model and not config.local_classifier_examples:
+            logger.warning("Local query classifier disabled: no local_classifier_examples given")
+        elif config.local_classifier_embedding_model:
+            embedding_config = OpenAIEmbeddingsConfig()
+            embedding_config.model_name = config.local_classifier_embedding_model
+            self._local_classifier = EmbeddingQueryClassifier(
+                OpenAIEmbeddings(embedding_config),
+                config.local_classifier_examples,
+                confidence=config.local_classifier_confidence
+            )
+        # handle_message's handler for each state; states not listed are a system error
+        self._dispatch = {
+            AgentState.IDLE: self._handle_new_query,
+            AgentState.WAITING_FEEDBACK: self._handle_feedback,
+            AgentState.PROBING: self._handle_probing,
+            AgentState.ERROR: self._handle_error_state,
+        }
+        # Notifications ahandle_message sends after replying; held so they aren't collected
+        self._background: Set[asyncio.Future] = set()
         
-        logger.info(f"MainAgent initialized with config: {config}")
+        logger.info("MainAgent initialized with config: %s", config)
+
+    # Sub-agents open vector stores and clients, so build them only when a
+    # session first needs them; general-chat-only sessions never do
+    @cached_property
+    def retrieval_agent(self) -> RetrievalAgent:
+        return RetrievalAgent(self.retrieval_config)
+
+    @cached_property
+    def probing_agent(self) -> ProbingAgent:
+        return ProbingAgent(self.probing_config)
+
+    # One per MainAgent, reused for every notification; background sends share it,
+    # which its thread-safe MongoDB and Slack tools allow
+    @cached_property
+    def notification_agent(self) -> NotificationAgent:
+        return NotificationAgent(self.notification_config)
 
     def handle_message(self, message: str) -> str:
         """Main message handler"""
         try:
-            logger.debug(f"Handling message in state {self.state}: {message}")
-            
-            if self.state == AgentState.IDLE:
-                return self._handle_new_query(message)
-                
-            elif self.state == AgentState.WAITING_FEEDBACK:
-                return self._handle_feedback(message)
-                
-            elif self.state == AgentState.PROBING:
-                response = self.probing_agent.handle_message(message)
-                
-                # If we get a dict back, probing is complete
+            logger.debug("Handling message in state %s: %s", self.state, message)
+            handler = self._dispatch.get(self.state, self._handle_unknown_state)
+            return handler(message)
+
+        except Exception as e:
+            logger.error("Error handling message: %s", e, exc_info=True)
+            self.transition_to(AgentState.ERROR)
+            return f"Error: {str(e)}"
+
+    def _handle_probing(self, message: str) -> str:
+        """Pass the reply to the probing agent; notify once it returns its summary"""
+        response = self.probing_agent.handle_message(message)
+
+        # If we get a dict back, probing is complete
+        if isinstance(response, dict):
+            self.context.probe_results = response
+            self.transition_to(AgentState.NOTIFYING)
+            return self._handle_notification()
+
+        # Otherwise, continue with next question
+        return response
+
+    def _handle_error_state(self, message: str) -> str:
+        self.transition_to(AgentState.IDLE)
+        return "Error occurred. Please try your question again."
+
+    def _handle_unknown_state(self, message: str) -> str:
+        self.transition_to(AgentState.ERROR)
+        return "System error. Please try again."
+
+    def handle_message_stream(self, message: str) -> Iterator[str]:
+        """Stream general chat answers token by token; other states respond in one piece"""
+        if self.state is not AgentState.IDLE:
+            yield self.handle_message(message)
+            return
+
+        try:
+            query_type = self._classify_query(message)
+            if query_type != "general_chat":
+                yield self._handle_new_query(message, query_type)
+                return
+
+            self.context.current_query = message
+            yield from self.llm.generate_stream(self._general_chat_prompt(message))
+        except Exception as e:
+            logger.error("Error streaming message: %s", e, exc_info=True)
+            self.transition_to(AgentState.ERROR)
+            yield f"Error: {str(e)}"
+
+    async def ahandle_message_stream(self, message: str) -> AsyncIterator[str]:
+        """Async handle_message_stream"""
+        if self.state is not AgentState.IDLE:
+            yield await self.ahandle_message(message)
+            return
+
+        try:
+            query_type = await self.aclassify_query(message)
+            if query_type != "general_chat":
+                # The classification is cached now, so this doesn't classify again
+                yield await self._ahandle_new_query(message)
+                return
+
+            self.context.current_query = message
+            async for piece in self.llm.agenerate_stream(self._general_chat_prompt(message)):
+                yield piece
+        except Exception as e:
+            logger.error("Error streaming message: %s", e, exc_info=True)
+            self.transition_to(AgentState.ERROR)
+            yield f"Error: {str(e)}"
+
+    async def ahandle_message(self, message: str) -> str:
+        """
+        Async handle_message for serving many sessions on one event loop. With
+        speculative_chat_draft, a new query is classified while a general chat
+        reply is drafted. The notification that ends a probing session is sent
+        after replying.
+        """
+        try:
+            logger.debug("Handling message in state %s: %s", self.state, message)
+
+            if self.state is AgentState.IDLE:
+                return await self._ahandle_new_query(message)
+
+            if self.state is AgentState.PROBING:
+                response = await self.probing_agent.ahandle_message(message)
                 if isinstance(response, dict):
                     self.context.probe_results = response
                     self.transition_to(AgentState.NOTIFYING)
-                    return self._handle_notification()
-                
-                # Otherwise, continue with next question
+                    return self._notify_in_background()
                 return response
-            # elif self.state == AgentState.NOTIFYING:
-            #     self.transition_to(AgentState.DONE)
-            #     self._reset()
-            #     return "Thank you for your feedback. I'll use it to improve future responses."
-
-            elif self.state == AgentState.ERROR:
-                self.transition_to(AgentState.IDLE)
-                return "Error occurred. Please try your question again."
-                
-            else:
-                self.transition_to(AgentState.ERROR)
-                return "System error. Please try again."
+
+            # Unsatisfied feedback asks the first probing question synchronously, so the
+            # remaining states run on a worker thread rather than block the loop
+            return await asyncio.get_running_loop().run_in_executor(None, self.handle_message, message)
 
         except Exception as e:
-            logger.error(f"Error handling message: {str(e)}", exc_info=True)
+            logger.error("Error handling message: %s", e, exc_info=True)
             self.transition_to(AgentState.ERROR)
             return f"Error: {str(e)}"
 
-    def _handle_new_query(self, query: str) -> str:
+    async def _ahandle_new_query(self, query: str) -> str:
+        """Async _handle_new_query"""
+        self.context.current_query = query
+
+        query_type = self._known_query_type(query.lower().strip())
+        draft = retrieval = None
+        if query_type is None:
+            if self.config.speculative_chat_draft:
+                # The classification and a general chat reply are independent requests;
+                # the draft is only used if the query turns out to be general chat
+                draft = asyncio.ensure_future(self.llm.agenerate(self._general_chat_prompt(query)))
+            if self.config.speculative_retrieval:
+                retrieval = asyncio.ensure_future(self.retrieval_agent.handle_message_parallel(query))
+            try:
+                query_type = await self.aclassify_query(query)
+            except BaseException:
+                self._discard(draft, retrieval)
+                raise
+        logger.debug("Query classified as: %s", query_type)
+
+        try:
+            if query_type == "general_chat":
+                self._discard(retrieval)
+                if draft is None:
+                    draft = self.llm.agenerate(self._general_chat_prompt(query))
+                return (await draft).get("message")
+            self._discard(draft)
+
+            self.transition_to(AgentState.RETRIEVING)
+            if retrieval is None:
+                retrieval = self.retrieval_agent.handle_message_parallel(query)
+            answer = await retrieval
+
+            logger.debug("Got answer: %s...", answer)
+            self.context.current_answer = answer
+            self.transition_to(AgentState.WAITING_FEEDBACK)
+            return f"{answer}\nAre you satisfied with this answer? (yes/no)"
+
+        except Exception as e:
+            logger.error("Error handling query: %s", e, exc_info=True)
+            self.transition_to(AgentState.ERROR)
+            return f"Failed to get answer: {str(e)}"
+
+    @staticmethod
+    def _discard(*tasks: Optional[asyncio.Future]) -> None:
+        """Cancel speculative work that turned out not to be needed"""
+        for task in tasks:
+            # A task that already failed is read here so its error isn't reported as unretrieved
+            if task is not None and not task.cancel() and not task.cancelled():
+                task.exception()
+
+    def _handle_new_query(self, query: str, query_type: Optional[str] = None) -> str:
         """Handle new query by determining appropriate response method"""
-        logger.debug(f"Handling new query: {query}")
+        logger.debug("Handling new query: %s", query)
         self.context.current_query = query
         
-        query_type = self._classify_query(query)
-        logger.debug(f"Query classified as: {query_type}")
+        answer = None
+        if query_type is None:
+            if self.config.single_call_routing:
+                query_type, answer = self._route_query(query)
+            else:
+                query_type = self._classify_query(query)
+        logger.debug("Query classified as: %s", query_type)
         
         try:
             if query_type == "general_chat":
-                answer = self._handle_general_chat(query)
-                answer = answer.get("message")
+                if answer is None:
+                    answer = self._handle_general_chat(query).get("message")
                 return answer 
             else:
                 self.transition_to(AgentState.RETRIEVING)
                 answer = self.retrieval_agent.handle_message(query)
             
-            logger.debug(f"Got answer: {answer}...")
+            logger.debug("Got answer: %s...", answer)
             self.context.current_answer = answer
             self.transition_to(AgentState.WAITING_FEEDBACK)
             return f"{answer}\nAre you satisfied with this answer? (yes/no)"
             
         except Exception as e:
-            logger.error(f"Error handling query: {str(e)}", exc_info=True)
+            logger.error("Error handling query: %s", e, exc_info=True)
             self.transition_to(AgentState.ERROR)
             return f"Failed to get answer: {str(e)}"
 
+    def _known_query_type(self, cache_key: str) -> Optional[str]:
+        """The query type if it is settled without the LLM, else None"""
+        # Bare yes/no style replies are small talk; no need to ask the LLM
+        if cache_key in FEEDBACK_WORDS:
+            return "general_chat"
+        return self._classification_cache.get(cache_key)
+
     def _classify_query(self, query: str) -> str:
         """Classify the type of query to determine appropriate handling"""
-        classification_prompt = f"""
-        Classify the following query as either 'general_chat' or 'needs_retrieval':
-        Query: {query}
-        
-        general_chat: General conversation, greetings, opinions, or simple questions
-        needs_retrieval: Questions requiring specific information, facts, or detailed knowledge
-        
-        Classification:"""
-        result = self.llm.generate(classification_prompt).get("message")
-        return "general_chat" if "general_chat" in result else "needs_retrieval"
+        cache_key = query.lower().strip()
+        query_type = self._known_query_type(cache_key)
+        if query_type is not None:
+            return query_type
+        query_type = self._local_classification(cache_key, query)
+        if query_type is not None:
+            return query_type
+
+        result = self.classifier_llm.generate(self._classification_prompt(query)).get("message")
+        return self._store_classification(cache_key, result)
+
+    def _local_classification(self, cache_key: str, query: str) -> Optional[str]:
+        """The local classifier's confident verdict, cached, or None to ask the llm"""
+        if self._local_classifier is None:
+            return None
+        try:
+            query_type = self._local_classifier.predict(query)
+        except Exception as e:
+            logger.warning("Local query classifier failed: %s", e)
+            return None
+        if query_type is not None:
+            self._classification_cache.set(cache_key, query_type)
+        return query_type
+
+    async def _alocal_classification(self, cache_key: str, query: str) -> Optional[str]:
+        """Async _local_classification"""
+        if self._local_classifier is None:
+            return None
+        try:
+            query_type = await self._local_classifier.apredict(query)
+        except Exception as e:
+            logger.warning("Local query classifier failed: %s", e)
+            return None
+        if query_type is not None:
+            self._classification_cache.set(cache_key, query_type)
+        return query_type
+
+    def _route_query(self, query: str) -> Tuple[str, Optional[str]]:
+        """Classify a query and, for general chat, answer it, in a single llm call
+
+        Returns the query type and the answer, which is None when the query needs
+        retrieval or the classification came from the cache.
+        """
+        cache_key = query.lower().strip()
+        query_type = self._known_query_type(cache_key)
+        if query_type is None:
+            query_type = self._local_classification(cache_key, query)
+        if query_type is not None:
+            return query_type, None
+
+        result = self.llm.generate(
+            [
+                {"role": "system", "content": self.config.system_message},
+                {"role": "system", "content": ROUTING_PROMPT},
+                {"role": "user", "content": query}
+            ],
+            functions=_ROUTE_FUNCTIONS,
+            function_call=_FORCE_ROUTE_CALL
+        )
+        try:
+            arguments = _json_loads(result["function_call"]["arguments"])
+            route = arguments["route"]
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Routing call returned no route, classifying separately")
+            return self._classify_query(query), None
+
+        query_type = self._store_classification(cache_key, route)
+        answer = arguments.get("answer") if query_type == "general_chat" else None
+        return query_type, answer or None
+
+    async def aclassify_query(self, query: str) -> str:
+        """
+        Async _classify_query for concurrent sessions; classifications issued
+        within the same short window are dispatched together.
+        """
+        cache_key = query.lower().strip()
+        query_type = self._known_query_type(cache_key)
+        if query_type is not None:
+            return query_type
+        query_type = await self._alocal_classification(cache_key, query)
+        if query_type is not None:
+            return query_type
+
+        response = await self._classification_batcher.generate(self._classification_prompt(query))
+        return self._store_classification(cache_key, response.get("message"))
+
+    def _classification_prompt(self, query: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": CLASSIFICATION_PROMPT},
+            {"role": "user", "content": "Query: " + self._classification_query(query)}
+        ]
+
+    def _classification_query(self, query: str) -> str:
+        """The query cut to max_classification_query_tokens"""
+        limit = self.config.max_classification_query_tokens
+        # Every token covers at least one UTF-8 byte, so short queries skip the tokenizer
+        if len(query.encode()) <= limit:
+            return query
+        tokens = self._classifier_tokenizer.encode(query)
+        if len(tokens) <= limit:
+            return query
+        return self._classifier_tokenizer.decode(tokens[:limit])
+
+    @cached_property
+    def _classifier_tokenizer(self):
+        model = getattr(self.classifier_llm.config, "chat_model", OpenAIChatModel.GPT4o_MINI)
+        try:
+            return get_encoder(model)
+        except KeyError:
+            # Model names tiktoken doesn't know; the count only bounds the prompt
+            return tiktoken.get_encoding("cl100k_base")
+
+    def _store_classification(self, cache_key: str, result: str) -> str:
+        """Map a classifier reply to a query type, caching successful verdicts"""
+        query_type = "general_chat" if "general_chat" in result else "needs_retrieval"
+        if not result.startswith("Error:"):
+            self._classification_cache.set(cache_key, query_type)
+        return query_type
 
     def _handle_general_chat(self, query: str) -> str:
         """Handle general chat queries directly with LLM"""
-        chat_prompt = f"""
-        {self.config.system_message}
-        
-        User: {query}
-        Assistant:"""
-        
-        return self.llm.generate(chat_prompt)
+        return self.llm.generate(self._general_chat_prompt(query))
+
+    def _general_chat_prompt(self, query: str) -> List[Dict[str, str]]:
+        """Build the messages for a general chat query, static system message first"""
+        return [
+            {"role": "system", "content": self.config.system_message},
+            {"role": "user", "content": query}
+        ]
 
     def _handle_feedback(self, feedback: str) -> str:
         """Handle user feedback on query responses"""
-        logger.info(f"Handling feedback: {feedback}")
+        logger.info("Handling feedback: %s", feedback)
         feedback = feedback.lower().strip()
         
-        FEEDBACK_SATISFIED = {"yes", "good", "correct", "perfect", "thanks"}
-        FEEDBACK_UNSATISFIED = {"no", "wrong", "incorrect", "bad", "not helpful"}
-        
         if feedback in FEEDBACK_SATISFIED:
             self.transition_to(AgentState.DONE)
             self._reset()
             return "Great! Let me know if you have any other questions."
             
-        elif feedback in FEEDBACK_UNSATISFIED:
+        elif feedback in FEEDBACK_UNSATISFIED or any(
+            phrase in feedback for phrase in FEEDBACK_UNSATISFIED_PHRASES
+        ):
             logger.info("Starting probing session for unsatisfied feedback")
             
             self.context.feedback_type = "unsatisfied"
@@ -191,19 +558,39 @@ class MainAgent(Agent):
         self.context.current_answer = None
         self.context.probe_count = 0
 
+    def _notification_payload(self) -> Dict[str, Any]:
+        return {
+            "feedback_type": self.context.feedback_type,
+            "original_query": self.context.current_query,
+            "probe_summary": self.context.probe_results
+        }
+
+    def _notify_in_background(self) -> str:
+        """Send the probing notification in a worker thread and reply at once"""
+        payload = self._notification_payload()
+        future = asyncio.get_running_loop().run_in_executor(None, self._send_notification, payload)
+        self._background.add(future)
+        future.add_done_callback(self._background.discard)
+        self.transition_to(AgentState.DONE)
+        self._reset()
+        return "Thank you for your feedback. I'll use it to improve future responses."
+
+    def _send_notification(self, payload: Dict[str, Any]) -> None:
+        try:
+            result = self.notification_agent.handle_message(payload)
+            if result.startswith("Error:"):
+                logger.error("Background notification failed: %s", result)
+        except Exception as e:
+            logger.error("Background notification failed: %s", e, exc_info=True)
+
     def _handle_notification(self) -> str:
         """Handle notification after probing is complete"""
         try:
-            notification_agent = NotificationAgent(self.notification_config)
-            notification_agent.handle_message({
-                "feedback_type": self.context.feedback_type,
-                "original_query": self.context.current_query,
-                "probe_summary": self.context.probe_results
-            })
+            self.notification_agent.handle_message(self._notification_payload())
             self.transition_to(AgentState.DONE)
             self._reset()
             return "Thank you for your feedback. I'll use it to improve future responses."
         except Exception as e:
-            logger.error(f"Error in notification: {str(e)}")
+            logger.error("Error in notification: %s", e)
             self.transition_to(AgentState.ERROR)
             return f"Error processing feedback: {str(e)}" 
\ No newline at end of file
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from querylytics.shared.infrastructure.embedding_models.base import EmbeddingModel
+
+logger = logging.getLogger(__name__)
+
+LABELS = ("general_chat", "needs_retrieval")
+# Below this many examples of a class, a fit over full-size embeddings separates
+# them perfectly and its probabilities are overconfident
+_MIN_EXAMPLES_PER_CLASS = 100
+
+
+class EmbeddingQueryClassifier:
+    """
+    Logistic regression over query embeddings: general_chat vs needs_retrieval.
+
+    Fit once, lazily, on caller-supplied (query, label) examples from real
+    traffic; a prediction is then one embedding call and a dot product instead
+    of a chat completion. Queries whose probability falls between the
+    confidence bounds are left undecided (None) so the caller can ask the LLM.
+    """
+
+    def __init__(
+        self,
+        embedder: EmbeddingModel,
+        examples: Sequence[Tuple[str, str]],
+        confidence: float = 0.8
+    ):
+        self.embedder = embedder
+        self.confidence = confidence
+        self.examples = list(examples)
+        for label in LABELS:
+            count = sum(1 for _, example_label in self.examples if example_label == label)
+            if not count:
+                raise ValueError(f"Query classifier needs examples labeled '{label}'")
+            if count < _MIN_EXAMPLES_PER_CLASS:
+                logger.warning(
+                    "Query classifier has only %d '%s' examples; its confidence will be overstated",
+                    count, label
+                )
+        # (weights, bias), published as one tuple so a reader never sees half a fit
+        self._model: Optional[Tuple[np.ndarray, np.float32]] = None
+        self._fit_lock = threading.Lock()
+
+    @staticmethod
+    def _features(embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+    def fit(self, embeddings: Sequence[Sequence[float]], labels: Sequence[str], epochs: int = 300) -> None:
+        """Fit the weights by full-batch gradient descent with a small L2 penalty"""
+        x = self._features(embeddings)
+        y = np.asarray([label == "general_chat" for label in labels], dtype=np.float32)
+        # Unit-norm features keep the loss well conditioned, so a large fixed step converges
+        weights = np.zeros(x.shape[1], dtype=np.float32)
+        bias = np.float32(0)
+        step, penalty = np.float32(2.0), np.float32(1e-3)
+        for _ in range(epochs):
+            error = 1 / (1 + np.exp(-(x @ weights + bias))) - y
+            weights -= step * (x.T @ error / len(y) + penalty * weights)
+            bias -= step * error.mean()
+        self._model = (weights, np.float32(bias))
+
+    def _ensure_fit(self) -> None:
+        if self._model is not None:
+            return
+        with self._fit_lock:
+            if self._model is None:
+                texts, labels = zip(*self.examples)
+                self.fit(self.embedder.embedding_fn()(list(texts)), labels)
+                logger.info("Fitted query classifier on %d examples", len(labels))
+
+    def _decide(self, embedding: Sequence[float]) -> Optional[str]:
+        weights, bias = self._model
+        score = float(self._features([embedding])[0] @ weights + bias)
+        probability = 1 / (1 + np.exp(-score))
+        if probability >= self.confidence:
+            return "general_chat"
+        if probability <= 1 - self.confidence:
+            return "needs_retrieval"
+        return None
+
+    def predict(self, query: str) -> Optional[str]:
+        """The query type, or None when the classifier isn't confident"""
+        self._ensure_fit()
+        return self._decide(self.embedder.embedding_fn()([query])[0])
+
+    async def apredict(self, query: str) -> Optional[str]:
+        """Async predict; the one-time fit runs in a worker thread"""
+        if self._model is None:
+            await asyncio.get_running_loop().run_in_executor(None, self._ensure_fit)
+        embeddings: List[List[float]] = await self.embedder.aembed([query])
+        return self._decide(embeddings[0])
@@ -1,24 +1,68 @@
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from pydantic import Field
 from querylytics.shared.infrastructure.agent.base import Agent, AgentConfig
-from querylytics.shared.infrastructure.vector_store.base import VectorStore, VectorStoreConfig
+from querylytics.shared.infrastructure.vector_store.base import VectorStore
 from querylytics.shared.infrastructure.vector_store.chromadb import ChromaDB, ChromaDBConfig
-from querylytics.shared.infrastructure.embedding_models.models import OpenAIEmbeddingsConfig
-from querylytics.shared.infrastructure.utils.chunks import chunk_text
+from querylytics.shared.infrastructure.vector_store.faiss import FAISSConfig
+from querylytics.shared.infrastructure.language_models.config.base import StreamError
+from querylytics.shared.infrastructure.embedding_models.models import OpenAIEmbeddingsConfig, batched, get_encoder
+from querylytics.shared.infrastructure.utils.cache import make_cache_key
+from querylytics.shared.infrastructure.utils.chunks import chunk_text_iter, chunk_tokens
+from itertools import takewhile
+import asyncio
+import json
 import logging
+import re
+import time
 
 logger = logging.getLogger(__name__)
 
+# Example time periods and report types recognised in queries. When several
+# match, the one listed last wins
+_TIME_PERIODS = ('Q1', 'Q2', 'Q3', 'Q4', '2023', '2024')
+_REPORT_TYPES = {
+    'win loss': 'Sales Performance',
+    'cac': 'Customer Acquisition',
+    'mrr': 'Revenue',
+    'lead': 'Marketing',
+}
+_PERIOD_RANK = {period.lower(): (rank, period) for rank, period in enumerate(_TIME_PERIODS)}
+_REPORT_TYPE_RANK = {key: (rank, value) for rank, (key, value) in enumerate(_REPORT_TYPES.items())}
+_PERIOD_RE = re.compile("|".join(map(re.escape, _TIME_PERIODS)), re.IGNORECASE)
+_REPORT_TYPE_RE = re.compile("|".join(map(re.escape, _REPORT_TYPES)), re.IGNORECASE)
+
+# Kept byte-identical across questions so it forms a cacheable prompt prefix
+ANALYST_PROMPT = (
+    "You are a business analyst. Based on the provided report sections, "
+    "provide a clear and concise answer with relevant metrics and insights."
+)
+
 class DocChatAgentConfig(AgentConfig):
     """Configuration for DocChatAgent"""
     retrieval_k: int = 5
+    min_similarity: float = 0.6  # Only keep high-confidence matches
     chunk_size: int = 500
     overlap: int = 50
-    vecdb_config: VectorStoreConfig = ChromaDBConfig(
-        collection_name="reports-store",
-        replace_collection=True,
-        storage_path="./../.chromadb/reports/",
-        embedding=OpenAIEmbeddingsConfig()
+    # Measure chunk_size and overlap in tokens of vecdb_config.embedding instead of
+    # characters. Only valid on a ChromaDB store with use_configured_embedding, the
+    # one setup that embeds with that model; the local default model has its own
+    # tokenizer and a much shorter context
+    chunk_by_tokens: bool = False
+    embedding_batch_size: int = 128  # Chunks embedded per embedding call during ingestion
+    # FAISSConfig keeps an in-memory FAISS index instead, for corpora small enough to hold
+    vecdb_config: Union[ChromaDBConfig, FAISSConfig] = Field(
+        default_factory=lambda: ChromaDBConfig(
+            collection_name="reports-store",
+            replace_collection=True,
+            storage_path="./../.chromadb/reports/",
+            embedding=OpenAIEmbeddingsConfig()
+        )
     )
+    qa_cache_enabled: bool = True  # Answer paraphrased questions from past answers (ChromaDB only)
+    qa_cache_collection: str = "doc-chat-qa-cache"
+    qa_cache_threshold: float = 0.85  # Minimum cosine similarity for a cache hit
+    qa_cache_ttl: float = 3600.0  # Seconds a cached answer stays valid
+    qa_cache_max_entries: int = 1024  # Oldest answers are evicted beyond this
 
 class DocChatAgent(Agent):
     """Agent for document search and Q&A"""
@@ -26,9 +70,42 @@ class DocChatAgent(Agent):
     def __init__(self, config: DocChatAgentConfig):
         super().__init__(config)
         self.config = config
+        if config.chunk_by_tokens and not (
+            isinstance(config.vecdb_config, ChromaDBConfig) and config.vecdb_config.use_configured_embedding
+        ):
+            raise ValueError(
+                "chunk_by_tokens requires a ChromaDB store with use_configured_embedding=True; "
+                "otherwise chunks are measured with a tokenizer the store doesn't embed with"
+            )
         self.vector_store = VectorStore.create(config.vecdb_config)
+        self.qa_cache = (
+            self._open_qa_cache()
+            if config.qa_cache_enabled and isinstance(self.vector_store, ChromaDB)
+            else None
+        )
         logger.info("DocChatAgent initialized with vector store")
 
+    def _open_qa_cache(self):
+        return self.vector_store.client.get_or_create_collection(
+            name=self.config.qa_cache_collection,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self.vector_store.embedding_function
+        )
+
+    def _reset_qa_cache(self) -> None:
+        """Drop every cached answer; they were drawn from the previous corpus"""
+        if self.qa_cache is None:
+            return
+        try:
+            # Dropping and recreating the collection is one call however many
+            # answers it held, and the persisted copy is cleared along with it
+            self.vector_store.client.delete_collection(self.config.qa_cache_collection)
+            self.qa_cache = self._open_qa_cache()
+            logger.info("Cleared QA cache after ingestion")
+        except Exception as e:
+            logger.warning("Failed to clear QA cache, disabling it: %s", e)
+            self.qa_cache = None
+
     def ingest_documents(self, reports: List[dict]) -> None:
         """Ingest reports into vector store
         
@@ -39,36 +116,48 @@ class DocChatAgent(Agent):
                 - metadata: Optional additional metadata
         """
         logger.info(f"Ingesting {len(reports)} reports")
-        chunks = []
-        metadatas = []
-        ids = []
+        total_chunks = 0
         
+        # Chunk, embed and write one batch at a time, so peak memory is bounded by
+        # the batch size rather than the whole corpus
+        for batch in batched(self._iter_chunks(reports), self.config.embedding_batch_size):
+            ids, chunks, metadatas = (list(column) for column in zip(*batch))
+            # The store embeds the batch itself, after dropping chunks it already holds
+            self.vector_store.add_documents(
+                documents=chunks,
+                metadatas=metadatas,
+                ids=ids
+            )
+            total_chunks += len(chunks)
+        if total_chunks:
+            self._reset_qa_cache()
+        logger.info(f"Ingested {total_chunks} chunks from {len(reports)} reports")
+
+    def _iter_chunks(self, reports: List[dict]) -> Iterator[Tuple[str, str, dict]]:
+        """Yield (id, text, metadata) for every chunk of every report"""
         for idx, report in enumerate(reports):
             # Create chunks from the description
-            report_chunks = chunk_text(
-                report['description'], 
-                self.config.chunk_size, 
-                self.config.overlap
-            )
+            report_chunks = self._chunk(report['description'])
             
-            # Add chunks with their metadata
+            # The report-level metadata is built once per report. The description
+            # itself is not repeated on every chunk; its chunks already hold the text
+            report_metadata = {
+                'title': report['title'],
+                'report_id': idx,
+                **report.get('metadata', {})
+            }
             for chunk_idx, chunk in enumerate(report_chunks):
-                chunks.append(chunk)
-                chunk_metadata = {
-                    'title': report['title'],
-                    'description': report['description'],
-                    'chunk_index': chunk_idx,
-                    **report.get('metadata', {})
-                }
-                metadatas.append(chunk_metadata)
-                ids.append(f"report_{idx}_chunk_{chunk_idx}")
-        
-        self.vector_store.add_documents(
-            documents=chunks,
-            metadatas=metadatas,
-            ids=ids
-        )
-        logger.info(f"Ingested {len(chunks)} chunks from {len(reports)} reports")
+                yield (
+                    f"report_{idx}_chunk_{chunk_idx}",
+                    chunk,
+                    {**report_metadata, 'chunk_index': chunk_idx}
+                )
+
+    def _chunk(self, text: str) -> Iterator[str]:
+        if self.config.chunk_by_tokens:
+            tokenizer = get_encoder(self.config.vecdb_config.embedding.model_name)
+            return iter(chunk_tokens(text, self.config.chunk_size, self.config.overlap, tokenizer))
+        return chunk_text_iter(text, self.config.chunk_size, self.config.overlap)
 
     def search(self, query: str, filter_dict: Optional[dict] = None) -> List[dict]:
         """Optimized search for business reports
@@ -77,34 +166,80 @@ class DocChatAgent(Agent):
             query: Search query
             filter_dict: Optional metadata filters for report categories/dates
         """
-        logger.info(f"Searching for: {query}")
+        logger.info("Searching for: %s", query)
         
-        # Primary search: Hybrid search with metadata filtering
-        results = self.vector_store.query(
-            query=query,
+        # Repeated queries reuse their cached embedding instead of re-embedding
+        results = self.vector_store.query_by_vector(
+            vector=self.vector_store.embed_query(query),
             top_k=self.config.retrieval_k,
-            include_metadata=True,
-            where=filter_dict,
-            alpha=0.7  # Bias towards semantic search (70%) while keeping some keyword matching (30%)
+            where=filter_dict
         )
-        # Apply distance threshold to ensure quality
-        filtered_results = [
-            result for result in results 
-            if result.get('similarity_score', 0) >= 0.6  # Only keep high-confidence matches
-        ]
-        
-        return filtered_results
+        # Apply distance threshold to ensure quality. Results arrive best-first, so
+        # the scan stops at the first one below it
+        return list(takewhile(
+            lambda result: result['similarity_score'] >= self.config.min_similarity,
+            results
+        ))
+
+    async def asearch(self, query: str, filter_dict: Optional[dict] = None) -> List[dict]:
+        """Async search; runs the blocking vector store query in a worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.search, query, filter_dict)
 
     def handle_message(self, message: str) -> str:
         """Handle a user query with business context"""
         # Extract potential time period and report type from query
         # Example: "What was our CAC in Q2?" or "Show me recent MRR trends"
         filters = self._extract_query_filters(message)
-        
+
+        cached = self._qa_cache_lookup(message, filters)
+        if cached is not None:
+            answer, score = cached
+            response = {"message": answer}
+            if score is not None:
+                response["similarity_score"] = score
+            return response
+
         results = self.search(message, filters)
         if not results:
             return "I couldn't find relevant information to answer your question."
-        
+
+        response = self.llm.generate(self._build_prompt(message, results))
+        answer = response.get("message")
+        # How well the best section matched, so callers can judge the answer's grounding
+        score = results[0]['similarity_score']
+        if answer and not answer.startswith("Error:"):
+            self._qa_cache_store(message, filters, answer, score)
+        response["similarity_score"] = score
+        return response
+
+    def handle_message_stream(self, message: str) -> Iterator[str]:
+        """Stream the answer to a user query as it is generated"""
+        filters = self._extract_query_filters(message)
+
+        cached = self._qa_cache_lookup(message, filters)
+        if cached is not None:
+            yield cached[0]
+            return
+
+        results = self.search(message, filters)
+        if not results:
+            yield "I couldn't find relevant information to answer your question."
+            return
+
+        pieces = []
+        failed = False
+        for piece in self.llm.generate_stream(self._build_prompt(message, results)):
+            # A stream can fail partway; its partial text must not be cached
+            failed = failed or isinstance(piece, StreamError)
+            pieces.append(piece)
+            yield piece
+        answer = "".join(pieces)
+        if answer and not failed:
+            self._qa_cache_store(message, filters, answer, results[0]['similarity_score'])
+
+    def _build_prompt(self, message: str, results: List[dict]) -> List[Dict[str, str]]:
+        """Build the analyst messages for a question and its retrieved report sections"""
         # Format context with business-specific structure
         contexts = []
         for r in results:
@@ -118,36 +253,87 @@ class DocChatAgent(Agent):
         
         full_context = "\n\n".join(contexts)
         
-        prompt = (
-            f"You are a business analyst. Based on the following report sections, "
-            f"provide a clear and concise answer with relevant metrics and insights:\n\n"
-            f"Context:\n{full_context}\n\n"
-            f"Question: {message}"
-        )
-        response = self.llm.generate(prompt)
-        return response
+        return [
+            {"role": "system", "content": ANALYST_PROMPT},
+            {"role": "user", "content": f"Context:\n{full_context}\n\nQuestion: {message}"}
+        ]
+
+    def _qa_cache_lookup(self, message: str, filters: Optional[dict]) -> Optional[Tuple[str, Optional[float]]]:
+        """A previous answer to a semantically equivalent question, if fresh, and the
+        similarity_score of the section it was grounded in"""
+        if self.qa_cache is None:
+            return None
+        try:
+            # Only questions with the same extracted filters are comparable: "CAC in Q2"
+            # and "CAC in Q3" embed almost identically but need different answers
+            # Same cached embedding the retrieval step uses, so a miss costs no extra embed
+            results = self.qa_cache.query(
+                query_embeddings=[list(self.vector_store.embed_query(message))],
+                n_results=1,
+                where={"filters": json.dumps(filters, sort_keys=True)},
+                include=["metadatas", "distances"]
+            )
+            if not results["ids"][0]:
+                return None
+            metadata = results["metadatas"][0][0]
+            similarity = 1 - results["distances"][0][0]
+            if similarity < self.config.qa_cache_threshold:
+                return None
+            if time.time() - metadata["timestamp"] > self.config.qa_cache_ttl:
+                return None
+            logger.info("QA cache hit (similarity=%.3f)", similarity)
+            return metadata["answer"], metadata.get("similarity_score")
+        except Exception as e:
+            logger.warning("QA cache lookup failed: %s", e)
+            return None
+
+    def _qa_cache_store(self, message: str, filters: Optional[dict], answer: str, score: float) -> None:
+        """Remember the answer to a question for later paraphrases"""
+        if self.qa_cache is None:
+            return
+        filters_key = json.dumps(filters, sort_keys=True)
+        try:
+            self.qa_cache.upsert(
+                ids=[make_cache_key(query=message, filters=filters_key)],
+                documents=[message],
+                embeddings=[list(self.vector_store.embed_query(message))],
+                metadatas=[{
+                    "answer": answer,
+                    "filters": filters_key,
+                    "similarity_score": score,
+                    "timestamp": time.time()
+                }]
+            )
+            self._qa_cache_evict()
+        except Exception as e:
+            logger.warning("QA cache store failed: %s", e)
+
+    def _qa_cache_evict(self) -> None:
+        """Drop the oldest cached answers once the cache is over capacity"""
+        max_entries = self.config.qa_cache_max_entries
+        count = self.qa_cache.count()
+        if count <= max_entries:
+            return
+        # Trim an extra tenth so eviction doesn't run again on every store
+        excess = count - max_entries + max_entries // 10
+        entries = self.qa_cache.get(include=["metadatas"])
+        by_age = sorted(zip(entries["ids"], entries["metadatas"]), key=lambda e: e[1]["timestamp"])
+        self.qa_cache.delete(ids=[entry_id for entry_id, _ in by_age[:excess]])
+        logger.info("Evicted %d QA cache entries", excess)
 
     def _extract_query_filters(self, query: str) -> Optional[dict]:
         """Extract relevant filters from the query"""
         filters = {}
-        
-        # Example time period detection
-        time_periods = ['Q1', 'Q2', 'Q3', 'Q4', '2023', '2024']
-        for period in time_periods:
-            if period.lower() in query.lower():
-                filters['period'] = period
-        
-        # Example report type detection
-        report_types = {
-            'win loss': 'Sales Performance',
-            'cac': 'Customer Acquisition',
-            'mrr': 'Revenue',
-            'lead': 'Marketing',
-        }
-        for key, value in report_types.items():
-            if key.lower() in query.lower():
-                filters['department'] = value
-        
+
+        # One regex scan per filter kind instead of a substring test per keyword
+        periods = {match.lower() for match in _PERIOD_RE.findall(query)}
+        if periods:
+            filters['period'] = max(_PERIOD_RANK[p] for p in periods)[1]
+
+        report_types = {match.lower() for match in _REPORT_TYPE_RE.findall(query)}
+        if report_types:
+            filters['department'] = max(_REPORT_TYPE_RANK[t] for t in report_types)[1]
+
         return filters if filters else None
 
     def inspect_database(self) -> dict:
@@ -156,14 +342,11 @@ class DocChatAgent(Agent):
         Returns:
             Dictionary containing collection stats and sample entries
         """
-        collection = self.vector_store.client.get_collection(
-            name=self.config.vecdb_config.collection_name
-        )
-        
-        result = collection.get()
+        # count and peek avoid materializing every document just to show five
+        sample = self.vector_store.peek(limit=5)
         
         return {
-            "total_documents": len(result['ids']),
+            "total_documents": self.vector_store.count(),
             "sample_entries": [
                 {
                     "id": id,
@@ -171,9 +354,9 @@ class DocChatAgent(Agent):
                     "content": content[:200] + "..." 
                 }
                 for id, metadata, content in zip(
-                    result['ids'][:5],
-                    result['metadatas'][:5],
-                    result['documents'][:5]
+                    sample['ids'],
+                    sample['metadatas'],
+                    sample['documents']
                 )
             ]
         }
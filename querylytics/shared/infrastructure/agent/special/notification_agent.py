@@ -1,14 +1,18 @@
 from querylytics.shared.infrastructure.agent.base import Agent, AgentConfig
-from querylytics.shared.infrastructure.tools.slack_tool import SlackTool
-from querylytics.shared.infrastructure.tools.mongodb_tool import MongoDBTool
-from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Callable, List, Optional
 import logging
 from datetime import datetime, timezone
+from functools import partial
 from os import getenv
 
 logger = logging.getLogger(__name__)
 
+# Bound once; every feedback document is stamped
+_utcnow = partial(datetime.now, timezone.utc)
+
+# Q&A pairs (or batch entries) written into one Slack message; the rest are summarized in a count
+_MAX_SLACK_QA_PAIRS = 200
+
 class NotificationAgentConfig(AgentConfig):
     """Configuration for NotificationAgent"""
     slack_webhook_url: Optional[str] = getenv('SLACK_WEBHOOK_URL')
@@ -22,6 +26,11 @@ class NotificationAgentConfig(AgentConfig):
 class NotificationAgent(Agent):
     def __init__(self, config: NotificationAgentConfig):
         super().__init__(config)
+        logger.debug("mongodb cluster url=%s", config.mongodb_cluster_url)
+        # Imported here, not at module level: pymongo is slow to import, and the
+        # config class is needed by every MainAgent even when no notification is sent
+        from querylytics.shared.infrastructure.tools.mongodb_tool import MongoDBTool
+        from querylytics.shared.infrastructure.tools.slack_tool import SlackTool
         
         self.slack_tool = SlackTool(
             webhook_url=config.slack_webhook_url,
@@ -42,41 +51,17 @@ class NotificationAgent(Agent):
         1. Store feedback in MongoDB
         2. Send Slack notification for important feedback
         """
-        logger.info("Starting handle_message with input: %s", message)
+        logger.debug("Starting handle_message with input: %s", message)
         try:
-            feedback_type = message.get("feedback_type")
-            original_query = message.get("original_query")
-            probe_summary = message.get("probe_summary", {})
-            
-            # Prepare document for MongoDB
-            feedback_document = {
-                "timestamp": datetime.now(timezone.utc),
-                "feedback_type": feedback_type,
-                "original_query": original_query,
-                "findings": probe_summary.get("findings"),
-                "responses": probe_summary.get("responses", []),
-                "status": "new"
-            }
-            
-            logger.info("Prepared feedback document: %s", feedback_document)
-            
-            try:
-                logger.info("Attempting to insert into MongoDB...")
-                result = self.mongodb_tool.insert_document(feedback_document)
-                logger.info(f"Successfully stored feedback in MongoDB with ID: {result.inserted_id}")
-            except Exception as e:
-                logger.error(f"Failed to store feedback in MongoDB: {str(e)}", exc_info=True)
-                raise
+            feedback_document = self._build_feedback_document(message)
+            logger.debug("Prepared feedback document: %s", feedback_document)
             
+            # The Slack message is formatted before the insert, which adds _id to the document
             slack_message = self._format_slack_message(feedback_document)
-            try:
-                self.slack_tool.send_message(
-                    message=slack_message,
-                    channel=self.config.slack_channel
-                )
-                logger.info("Sent feedback notification to Slack")
-            except Exception as e:
-                logger.error(f"Failed to send Slack notification: {str(e)}")
+            result = self._store_and_notify(
+                self.mongodb_tool.insert_document, feedback_document, slack_message
+            )
+            logger.info(f"Successfully stored feedback in MongoDB with ID: {result.inserted_id}")
             
             return "Notification processed successfully"
             
@@ -84,38 +69,104 @@ class NotificationAgent(Agent):
             logger.error(f"Error processing notification: {str(e)}")
             return f"Error: {str(e)}"
 
+    def handle_batch(self, messages: List[dict]) -> str:
+        """
+        Handle many notifications at once, e.g. when queued feedback is replayed:
+        one MongoDB insert_many and one summary Slack message for the whole batch
+        """
+        logger.info("Starting handle_batch with %d messages", len(messages))
+        if not messages:
+            return "No notifications to process"
+        try:
+            feedback_documents = [self._build_feedback_document(message) for message in messages]
+            slack_message = self._format_slack_batch(feedback_documents)
+            result = self._store_and_notify(
+                self.mongodb_tool.insert_many, feedback_documents, slack_message
+            )
+            logger.info("Successfully stored %d feedback documents in MongoDB", len(result.inserted_ids))
+            
+            return f"Processed {len(feedback_documents)} notifications successfully"
+            
+        except Exception as e:
+            logger.error(f"Error processing notification batch: {str(e)}")
+            return f"Error: {str(e)}"
+
+    @staticmethod
+    def _build_feedback_document(message: dict) -> dict:
+        """Prepare the MongoDB document for one feedback message"""
+        probe_summary = message.get("probe_summary", {})
+        return {
+            "timestamp": _utcnow(),
+            "feedback_type": message.get("feedback_type"),
+            "original_query": message.get("original_query"),
+            "findings": probe_summary.get("findings"),
+            "responses": probe_summary.get("responses", []),
+            "status": "new"
+        }
+
+    def _store_and_notify(self, insert: Callable[[Any], Any], documents: Any, slack_message: str) -> Any:
+        """Run a MongoDB insert, then the Slack post; returns the insert result
+
+        The post only goes out once the feedback is stored, so Slack never
+        announces feedback that was lost. A MongoDB failure is logged and
+        re-raised, a Slack failure is only logged.
+        """
+        try:
+            logger.info("Attempting to insert into MongoDB...")
+            result = insert(documents)
+        except Exception as e:
+            logger.error(f"Failed to store feedback in MongoDB: {str(e)}", exc_info=True)
+            raise
+
+        if self.slack_tool.send_message(message=slack_message, channel=self.config.slack_channel):
+            logger.info("Sent feedback notification to Slack")
+        else:
+            logger.error("Failed to send Slack notification")
+        return result
+
+    def _format_slack_batch(self, feedback_documents: List[dict]) -> str:
+        """Format one summary Slack message for a batch of feedback"""
+        message = [f"*{len(feedback_documents)} New Feedback Alerts* 🔔", ""]
+        message.extend(
+            f"• *{feedback.get('feedback_type', 'N/A')}:* {feedback.get('original_query', 'N/A')}"
+            for feedback in feedback_documents[:_MAX_SLACK_QA_PAIRS]
+        )
+        if len(feedback_documents) > _MAX_SLACK_QA_PAIRS:
+            message.append(f"...and {len(feedback_documents) - _MAX_SLACK_QA_PAIRS} more")
+        return "\n".join(message)
+
     def _format_slack_message(self, feedback: dict) -> str:
         """Format feedback data for Slack notification"""
 
-        findings = str(feedback.get("findings", "No findings available"))
         responses = feedback.get("responses", [])
-        query = str(feedback.get("original_query", "N/A"))
-        feedback_type = str(feedback.get("feedback_type", "N/A"))
         
         # Create a formatted message for Slack
         message = [
             "*New Feedback Alert* 🔔",
-            f"*Query:* {query}",
-            f"*Type:* {feedback_type}",
+            f"*Query:* {feedback.get('original_query', 'N/A')}",
+            f"*Type:* {feedback.get('feedback_type', 'N/A')}",
             "",
             "*Summary of Findings:*",
-            findings,
+            f"{feedback.get('findings', 'No findings available')}",
             "",
             "*Q&A Session:*"
         ]
         
-        # Format the Q&A pairs
+        # Format the Q&A pairs; Slack caps message size, so very long sessions are truncated
         if responses:
-            for qa in responses:
-                try:
-                    question = qa.get('question', 'No question')
-                    answer = qa.get('answer', 'No answer')
-                    message.append(f"*Q:* {question}")
-                    message.append(f"*A:* {answer}\n")
-                except Exception as e:
-                    logger.error(f"Error formatting QA pair: {e}")
-                    message.append("Error formatting response")
+            message.extend(map(self._format_qa_pair, responses[:_MAX_SLACK_QA_PAIRS]))
+            if len(responses) > _MAX_SLACK_QA_PAIRS:
+                message.append(f"...and {len(responses) - _MAX_SLACK_QA_PAIRS} more responses")
         else:
             message.append("No responses available")
         
-        return "\n".join(message) 
\ No newline at end of file
+        return "\n".join(message)
+
+    @staticmethod
+    def _format_qa_pair(qa: dict) -> str:
+        """Format one Q&A pair as its Slack lines"""
+        try:
+            return f"*Q:* {qa.get('question', 'No question')}\n*A:* {qa.get('answer', 'No answer')}\n"
+        except Exception as e:
+            logger.error(f"Error formatting QA pair: {e}")
+            return "Error formatting response"
@@ -1,23 +1,49 @@
-from querylytics.shared.infrastructure.agent.base import Agent, AgentConfig, AgentState
+from querylytics.shared.infrastructure.agent.base import Agent, AgentConfig
 import logging
-from typing import Union
+import json
+import re
+import textwrap
+from typing import Dict, List, Union
+
+from orjson import loads as _json_loads
 
 logger = logging.getLogger(__name__)
 
+# Static instructions lead every prompt as the system message, byte-identical across
+# calls, so the provider can reuse its cached prefill; only the transcript varies
+_QUESTION_INSTRUCTIONS = (
+    "Generate a focused question to better understand the user's concerns.\n"
+    "Respond with just the question, no additional text."
+)
+_SUMMARY_INSTRUCTIONS = """Summarize the conversation you are given:
+1. Main issues identified
+2. Specific improvements needed
+3. Key action items
+
+Format as JSON with these keys: issues, improvements, actions
+Return only the JSON object, no markdown formatting."""
+
+# A JSON object inside a markdown code fence, for models that add one anyway
+_JSON_FENCE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.S)
+_FALLBACK_QUESTION = 'What specific improvements would you like to see?'
+
 class ProbingAgentConfig(AgentConfig):
     """Configuration for ProbingAgent"""
     max_questions: int = 5
-    system_message: str = """
+    system_message: str = textwrap.dedent("""
     You are a probing agent that asks clarifying questions to understand why a user was not satisfied with a previous answer.
     Ask focused, relevant questions one at a time.
     Be empathetic and constructive in your questioning.
-    """
+    """).strip()
 
 class ProbingAgent(Agent):
     def __init__(self, config: ProbingAgentConfig):
         super().__init__(config)
         # Initialize with a list to store Q&A pairs
         self.collected_responses = []
+        # Transcript lines, formatted once as each answer arrives
+        self._history_lines = []
+        self._question_system_message = config.system_message.strip() + "\n\n" + _QUESTION_INSTRUCTIONS
         self.question_counter = 0
         self.current_question = None
         
@@ -31,12 +57,14 @@ class ProbingAgent(Agent):
             "answer": answer
         }
         self.collected_responses.append(qa_pair)
+        self._history_lines.append(f"Q: {question}\nA: {answer}\n")
 
     def handle_message(self, message: str) -> Union[str, dict]:
         """Handle incoming messages and manage the probing conversation"""
-        logger.info(f"Handling message in probing. Question count: {self.question_counter}")
+        logger.info("Handling message in probing. Question count: %s", self.question_counter)
         
-        if self.current_question:
+        # Answers after the last question are not stored, so the transcript stays bounded
+        if self.current_question and self.question_counter < self.config.max_questions:
             self._store_response(self.current_question, message)
         
         # Check if we should finish probing
@@ -47,47 +75,73 @@ class ProbingAgent(Agent):
         self.current_question = self._generate_next_question()
         return self.current_question
 
-    def _generate_next_question(self) -> str:
-        """Generate the next contextual question based on previous responses"""
-        # Format the conversation history
-        conversation_history = ""
-        for qa in self.collected_responses:
-            conversation_history += f"Q: {qa['question']}\nA: {qa['answer']}\n"
+    async def ahandle_message(self, message: str) -> Union[str, dict]:
+        """Async handle_message; awaits the LLM so many sessions can share one event loop"""
+        logger.info("Handling message in probing. Question count: %s", self.question_counter)
         
-        prompt = f"""
-        Previous responses:
-        {conversation_history}
-
-        Question {self.question_counter + 1} of {self.config.max_questions}:
-        Generate a focused question to better understand the user's concerns.
-        Respond with just the question, no additional text.
-        """
+        if self.current_question and self.question_counter < self.config.max_questions:
+            self._store_response(self.current_question, message)
         
-        response = self.llm.generate(prompt)
-        return response.get('message', 'What specific improvements would you like to see?')
+        if self.question_counter >= self.config.max_questions:
+            return await self._acreate_summary()
+            
+        self.current_question = await self._agenerate_next_question()
+        return self.current_question
+
+    def _format_responses(self) -> str:
+        """Format the collected Q&A pairs as a transcript"""
+        return "".join(self._history_lines)
+
+    def _next_question_prompt(self) -> List[Dict[str, str]]:
+        """Messages for the next question. Probing prompts depend only on the transcript,
+        so they opt into the response cache and identical sessions reuse answers"""
+        return [
+            {"role": "system", "content": self._question_system_message},
+            {
+                "role": "user",
+                "content": (
+                    "Previous responses:\n"
+                    + self._format_responses()
+                    + f"\nQuestion {self.question_counter + 1} of {self.config.max_questions}:"
+                )
+            }
+        ]
+
+    def _generate_next_question(self) -> str:
+        """Generate the next contextual question based on previous responses"""
+        response = self.llm.generate(self._next_question_prompt(), use_cache=True)
+        return response.get('message', _FALLBACK_QUESTION)
+
+    async def _agenerate_next_question(self) -> str:
+        """Async _generate_next_question"""
+        response = await self.llm.agenerate(self._next_question_prompt(), use_cache=True)
+        return response.get('message', _FALLBACK_QUESTION)
 
     def _create_summary(self) -> dict:
         """Create a summary of the probing session"""
-        # Format the conversation history
-        conversation_history = ""
-        for qa in self.collected_responses:
-            conversation_history += f"Q: {qa['question']}\nA: {qa['answer']}\n"
-        
-        prompt = f"""
-        Based on this conversation:
-        {conversation_history}
-        
-        Summarize:
-        1. Main issues identified
-        2. Specific improvements needed
-        3. Key action items
-        
-        Format as JSON with these keys: issues, improvements, actions
-        Return only the JSON object, no markdown formatting.
-        """
-        
         try:
-            response = self.llm.generate(prompt)
+            response = self.llm.generate(self._summary_prompt(), use_cache=True)
+        except Exception as e:
+            return self._summary_error(e)
+        return self._summary_result(response)
+
+    async def _acreate_summary(self) -> dict:
+        """Async _create_summary"""
+        try:
+            response = await self.llm.agenerate(self._summary_prompt(), use_cache=True)
+        except Exception as e:
+            return self._summary_error(e)
+        return self._summary_result(response)
+
+    def _summary_prompt(self) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": _SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": "Conversation:\n" + self._format_responses()}
+        ]
+
+    def _summary_result(self, response: dict) -> dict:
+        """Parse the summary LLM response into the session result"""
+        try:
             logger.info("Generated probing agent summary")
             
             # Get the message content
@@ -99,12 +153,10 @@ class ProbingAgent(Agent):
             else:
                 # Try to parse if it's a string
                 try:
-                    import json
                     # Clean up markdown if present
-                    if '```' in message:
-                        message = message.split('```json\n')[1].split('\n```')[0]
-                    findings = json.loads(message)
-                except (json.JSONDecodeError, IndexError):
+                    fenced = _JSON_FENCE.search(message)
+                    findings = _json_loads(fenced.group(1) if fenced else message)
+                except json.JSONDecodeError:
                     logger.warning("Failed to parse response")
                     findings = {
                         "issues": ["Unable to parse response"],
@@ -118,9 +170,12 @@ class ProbingAgent(Agent):
                 "responses": self.collected_responses
             }
         except Exception as e:
-            logger.error(f"Failed to generate summary: {str(e)}")
-            return {
-                "status": "error",
-                "findings": "Error generating summary",
-                "responses": self.collected_responses
-            } 
\ No newline at end of file
+            return self._summary_error(e)
+
+    def _summary_error(self, error: Exception) -> dict:
+        logger.error(f"Failed to generate summary: {str(error)}")
+        return {
+            "status": "error",
+            "findings": "Error generating summary",
+            "responses": self.collected_responses
+        }
@@ -1,16 +1,46 @@
-from typing import List, Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from querylytics.shared.infrastructure.agent.base import Agent, AgentConfig, AgentState
 from querylytics.shared.infrastructure.agent.tool_message import ToolMessage
 from querylytics.shared.infrastructure.language_models.openai_gpt import OpenAIGPTConfig, OpenAIChatModel
 from querylytics.shared.infrastructure.agent.special.doc_chat_agent import DocChatAgentConfig, DocChatAgent
+from querylytics.shared.infrastructure.language_models.semantic_cache import SemanticCache
 import logging
+import threading
+import weakref
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import json
+import textwrap
+from pydantic import Field
+
+from orjson import loads as _json_loads
 
 logger = logging.getLogger(__name__)
 
+# Shared so sync API searches reuse kept-alive connections instead of a new handshake each
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=64))
+_HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=64))
+
+# Sent verbatim as the system message so it forms a cacheable prompt prefix;
+# the query and search results follow in the user message
+_SELECTION_INSTRUCTIONS = """You will be given a query and the results of two searches for it.
+
+Please:
+1. Evaluate the relevance of each source to the original query
+2. Select the most relevant information
+3. If both sources contain complementary information, combine them
+4. If the information conflicts, explain which source seems more reliable and why
+5. Provide a final answer based on the most relevant and reliable information
+
+Format your response as:
+EVALUATION: [Brief evaluation of sources]
+SELECTED SOURCE(S): [Which source(s) you're using]
+ANSWER: [Your synthesized answer]"""
+
 class APISearchTool(ToolMessage):
     """Search external API for data"""
     request: str = "api_search"
@@ -29,6 +59,11 @@ class APISearchTool(ToolMessage):
         }
     }
 
+# Built once so every forced search call sends the identical tool definition, which
+# keeps the tool-schema tokens of the prompt prefix stable for provider-side caching
+_SEARCH_FUNCTIONS = [APISearchTool.default_value("function_schema")]
+_FORCE_SEARCH_CALL = {"name": _SEARCH_FUNCTIONS[0]["name"]}
+
 class VectorSearchTool(ToolMessage):
     """Search vector database for relevant documents"""
     request: str = "vector_search"
@@ -42,9 +77,15 @@ class RetrievalAgentConfig(AgentConfig):
     api_base_url: str = ""
     api_key: str = ""
     retrieval_k: int = 5
-    min_relevance_score: float = 0.7
-    doc_chat_config: Optional[DocChatAgentConfig] = DocChatAgentConfig()
-    system_message: str = """
+    # Best-match similarity_score at which a vector answer skips the API search. The
+    # score is (1 + cosine) / 2, so 0.85 means a cosine similarity of 0.7
+    min_relevance_score: float = 0.85
+    doc_chat_config: Optional[DocChatAgentConfig] = Field(default_factory=DocChatAgentConfig)
+    answer_cache_enabled: bool = True  # Answer paraphrased queries without searching again
+    answer_cache_threshold: float = 0.92  # Minimum cosine similarity for a cache hit
+    answer_cache_max_entries: int = 4096  # Least recently used answers are replaced beyond this
+    answer_cache_ttl: float = 3600.0  # Seconds a cached answer stays valid
+    system_message: str = textwrap.dedent("""
     You are a retrieval agent with access to two tools:
     - vectorsearchtool: For searching internal documents
     - apisearchtool: For searching external sources
@@ -62,19 +103,44 @@ class RetrievalAgentConfig(AgentConfig):
     All responses from tools must be formatted as:
     SOURCE: [source_name]
     EXTRACT: [First 3 words ... last 3 words]
-    """
-    llm: OpenAIGPTConfig = OpenAIGPTConfig(
-        chat_model=OpenAIChatModel.GPT4,
-        temperature=0.7
+    """).strip()
+    llm: OpenAIGPTConfig = Field(
+        default_factory=lambda: OpenAIGPTConfig(
+            chat_model=OpenAIChatModel.GPT4,
+            temperature=0.7
+        )
     )
 
 class RetrievalAgent(Agent):
     """Agent that combines RAG capabilities with API calls"""
+
+    # Shared across instances: one loop runs every sync handle_message call, and
+    # tool calls run on one pool, instead of building both on each request
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _loop_lock = threading.Lock()
+    _executor = ThreadPoolExecutor(max_workers=16)
     
     def __init__(self, config: RetrievalAgentConfig):
         super().__init__(config)
         self.config = config
         self.doc_chat_agent = DocChatAgent(config.doc_chat_config) if config.doc_chat_config else None
+        # Queries are embedded with the document store's embedder, so it needs DocChat
+        self.answer_cache = (
+            SemanticCache(
+                threshold=config.answer_cache_threshold,
+                max_entries=config.answer_cache_max_entries,
+                ttl=config.answer_cache_ttl
+            )
+            if config.answer_cache_enabled and self.doc_chat_agent
+            else None
+        )
+        self._answer_cache_lock = threading.Lock()
+        # One keep-alive client per event loop the agent is awaited on; an entry goes
+        # away with its loop, so alternating loops never orphan an open pool
+        self._http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._http_lock = threading.Lock()
         
         # Register tools
         self.register_tool(VectorSearchTool)
@@ -104,22 +170,48 @@ class RetrievalAgent(Agent):
     def apisearchtool(self, tool: APISearchTool) -> str:
         """Execute API search through HTTP request"""
         try:
-            logger.info(f"Starting API search with tool: {tool}")
+            logger.debug("Starting API search with tool: %s", tool)
             
             # Make the API request using the query from the function call
-            response = requests.get(
+            response = _HTTP_SESSION.get(
                 tool.endpoint,
                 params=tool.query_params,
                 headers={"Authorization": f"Bearer {self.config.api_key}"} if self.config.api_key else None
             )
             
             response.raise_for_status()
-            return response.json().get("message") or str(response.json())
+            data = response.json()
+            return data.get("message") or str(data)
+
+        except Exception as e:
+            logger.error(f"Error in API search: {e}")
+            return None
 
+    async def aapisearchtool(self, tool: APISearchTool) -> Optional[str]:
+        """Async apisearchtool; the request is awaited on the loop instead of holding a thread"""
+        try:
+            logger.debug("Starting API search with tool: %s", tool)
+            response = await self._get_http().get(tool.endpoint, params=tool.query_params)
+            response.raise_for_status()
+            data = response.json()
+            return data.get("message") or str(data)
         except Exception as e:
             logger.error(f"Error in API search: {e}")
             return None
 
+    def _get_http(self) -> httpx.AsyncClient:
+        """Get the keep-alive HTTP client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._http_lock:
+            client = self._http_clients.get(loop)
+            if client is None:
+                client = self._http_clients[loop] = httpx.AsyncClient(
+                    headers={"Authorization": f"Bearer {self.config.api_key}"} if self.config.api_key else None,
+                    timeout=20,
+                    limits=httpx.Limits(max_keepalive_connections=32)
+                )
+            return client
+
     def llm_response(self, message: str) -> str:
         """Override llm_response to handle tool results and retries"""
         try:
@@ -153,14 +245,12 @@ class RetrievalAgent(Agent):
 
     def _try_get_answer(self, message: str) -> Optional[str]:
         """Helper method to try getting an answer using tools"""
-        # Get the function schema from our tool
-        functions = [APISearchTool.function_schema]
-        
         # Call LLM with the function schema
         llm_result = self.llm.generate(
             message,
-            functions=functions,  # Pass the available functions
-            function_call={"name": "search_documents"}  # Force it to use our function
+            functions=_SEARCH_FUNCTIONS,  # Pass the available functions
+            function_call=_FORCE_SEARCH_CALL,  # Force it to use our function
+            use_cache=True  # The same message always maps to the same search query
         )
         
         if not llm_result:
@@ -173,7 +263,7 @@ class RetrievalAgent(Agent):
             
         # Extract the query from the function call
         try:
-            query = json.loads(function_call["arguments"])["query"]
+            query = _json_loads(function_call["arguments"])["query"]
             
             # Create and execute the tool with the query
             tool = APISearchTool(
@@ -188,30 +278,45 @@ class RetrievalAgent(Agent):
             return None
         
     async def handle_message_parallel(self, message: str) -> str:
+        vector_task = api_task = None
+        previous_state = self.state
         try:
             if not self.llm:
                 logger.error("LLM not configured")
                 return "LLM not configured"
 
             self.transition_to(AgentState.PROCESSING)
+
+            # A paraphrase of a recent query skips both searches and the selection call.
+            # Embedding and filter extraction block, so they run off the event loop
+            loop = asyncio.get_running_loop()
+            embedding, scope = await loop.run_in_executor(self._executor, self._answer_cache_key, message)
+            cached = self._answer_cache_lookup(embedding, scope)
+            if cached is not None:
+                return cached
             
             # Step 1: Gather results from both tools in parallel
-            executor = ThreadPoolExecutor()
-            try:
-                vector_task = asyncio.create_task(
-                    self._async_tool_execution(executor, VectorSearchTool, message)
-                )
-                api_task = asyncio.create_task(
-                    self._async_tool_execution(executor, APISearchTool, message)
-                )
+            vector_task = asyncio.create_task(
+                self._async_tool_execution(self._executor, VectorSearchTool, message)
+            )
+            api_task = asyncio.create_task(
+                self._async_tool_execution(self._executor, APISearchTool, message)
+            )
 
-                results = await asyncio.gather(
-                    vector_task, 
-                    api_task, 
-                    return_exceptions=True
-                )
-            finally:
-                executor.shutdown(wait=False)
+            # Only the vector search reports a relevance score, so it alone can settle
+            # the answer early: a confident hit cancels the API call and skips selection
+            await asyncio.wait({vector_task})
+            confident = self._confident_vector_answer(vector_task)
+            if confident is not None:
+                api_task.cancel()
+                self._answer_cache_store(embedding, scope, confident)
+                return confident
+
+            results = await asyncio.gather(
+                vector_task, 
+                api_task, 
+                return_exceptions=True
+            )
 
             # Step 2: Process and structure the results
             structured_results = {
@@ -219,9 +324,17 @@ class RetrievalAgent(Agent):
                 "api_search": self._process_result(results[1], "api_search")
             }
 
+            # With fewer than two distinct usable answers there is nothing to choose between
+            usable = self._usable_answers(structured_results)
+            if not usable:
+                return "No relevant information found."
+            if len(usable) == 1:
+                self._answer_cache_store(embedding, scope, usable[0])
+                return usable[0]
+
             # Step 3: Ask LLM to evaluate and select the most relevant information
             selection_prompt = self._create_selection_prompt(message, structured_results)
-            selection_result = self.llm.generate(selection_prompt)
+            selection_result = await self.llm.agenerate(selection_prompt, use_cache=True)
             if not selection_result:
                 return "Failed to evaluate search results."
             
@@ -231,16 +344,87 @@ class RetrievalAgent(Agent):
                 # Find the ANSWER section
                 if "ANSWER:" in message:
                     answer = message.split("ANSWER:")[1].strip()
-                    return answer
-                return message  # Return full message if no ANSWER section found
+                else:
+                    answer = message  # Return full message if no ANSWER section found
+                if answer and not answer.startswith("Error:"):
+                    self._answer_cache_store(embedding, scope, answer)
+                return answer
             
             return "No relevant information found."
 
+        except asyncio.CancelledError:
+            # Dropped speculation: stop the searches it started and leave the agent's
+            # state as it found it. Work already running in the executor still finishes
+            for task in (vector_task, api_task):
+                if task is not None:
+                    task.cancel()
+            self.transition_to(previous_state)
+            raise
         except Exception as e:
             logger.error(f"Error in parallel message handling: {str(e)}")
             self.transition_to(AgentState.ERROR)
             return f"Error in message handling: {str(e)}"
 
+    def _answer_cache_key(self, message: str) -> Tuple[Optional[tuple], Optional[str]]:
+        """Embed a query for the answer cache, with the filters it must match exactly
+
+        The embedding is None if the cache is off or embedding fails.
+        """
+        if self.answer_cache is None:
+            return None, None
+        try:
+            embedding = self.doc_chat_agent.vector_store.embed_query(message)
+        except Exception as e:
+            logger.warning("Skipping answer cache, embedding failed: %s", e)
+            return None, None
+        # "CAC in Q2" and "CAC in Q3" embed almost identically but need different answers
+        scope = json.dumps(self.doc_chat_agent._extract_query_filters(message), sort_keys=True)
+        return embedding, scope
+
+    def _answer_cache_lookup(self, embedding: Optional[tuple], scope: Optional[str]) -> Optional[str]:
+        """Return the answer to a similar recent query, if it is fresh and has the same filters"""
+        if embedding is None:
+            return None
+        with self._answer_cache_lock:
+            entry = self.answer_cache.lookup(embedding)
+        if entry is None or entry[0] != scope:
+            return None
+        logger.info("Answer cache hit")
+        return entry[1]
+
+    def _answer_cache_store(self, embedding: Optional[tuple], scope: Optional[str], answer: str) -> None:
+        if embedding is None:
+            return
+        with self._answer_cache_lock:
+            self.answer_cache.add(embedding, (scope, answer))
+
+    def _confident_vector_answer(self, vector_task: "asyncio.Task") -> Optional[str]:
+        """The vector search answer, if its best match clears min_relevance_score"""
+        if vector_task.cancelled() or vector_task.exception() is not None:
+            return None
+        result = vector_task.result()
+        if not isinstance(result, dict):
+            return None
+        score = result.get("similarity_score")
+        answer = result.get("message")
+        if score is None or score < self.config.min_relevance_score:
+            return None
+        if not answer or answer.startswith("Error:"):
+            return None
+        logger.info("Confident vector search hit (score=%.3f), skipping API search", score)
+        return answer
+
+    def _usable_answers(self, results: Dict) -> List[str]:
+        """Distinct successful answers across sources, ignoring "not found"-style replies"""
+        answers = {}
+        for result in results.values():
+            if result["status"] != "success" or not self._is_valid_result(result["data"]):
+                continue
+            answer = str(result["data"])
+            # Answers that differ only in whitespace or case count as the same
+            answers.setdefault(" ".join(answer.split()).casefold(), answer)
+        return list(answers.values())
+
     def _process_result(self, result: Any, source: str) -> Dict:
         """Process and structure results from different tools"""
         if isinstance(result, Exception):
@@ -263,30 +447,19 @@ class RetrievalAgent(Agent):
             "data": data
         }
 
-    def _create_selection_prompt(self, original_query: str, results: Dict) -> str:
-        """Create a prompt for LLM to evaluate and select the most relevant information"""
-        prompt = f"""
-Given the following search results for the query: "{original_query}"
-
-Vector Search Results:
-{self._format_results(results['vector_search'])}
-
-API Search Results:
-{self._format_results(results['api_search'])}
-
-Please:
-1. Evaluate the relevance of each source to the original query
-2. Select the most relevant information
-3. If both sources contain complementary information, combine them
-4. If the information conflicts, explain which source seems more reliable and why
-5. Provide a final answer based on the most relevant and reliable information
-
-Format your response as:
-EVALUATION: [Brief evaluation of sources]
-SELECTED SOURCE(S): [Which source(s) you're using]
-ANSWER: [Your synthesized answer]
-"""
-        return prompt
+    def _create_selection_prompt(self, original_query: str, results: Dict) -> List[Dict[str, str]]:
+        """Create the messages asking the LLM to evaluate and select the most relevant information"""
+        return [
+            {"role": "system", "content": _SELECTION_INSTRUCTIONS},
+            {
+                "role": "user",
+                "content": (
+                    f'Query: "{original_query}"\n\n'
+                    f"Vector Search Results:\n{self._format_results(results['vector_search'])}\n\n"
+                    f"API Search Results:\n{self._format_results(results['api_search'])}"
+                )
+            }
+        ]
 
     def _format_results(self, result: Dict) -> str:
         """Format results for the prompt"""
@@ -300,18 +473,23 @@ ANSWER: [Your synthesized answer]
     async def _async_tool_execution(self, executor: ThreadPoolExecutor, tool_class, message: str) -> Optional[str]:
         """Execute tool asynchronously"""
         try:
-            logger.info(f"Starting async execution for tool: {tool_class.__name__}")
+            logger.debug("Starting async execution for tool: %s", tool_class.__name__)
             params = self._extract_tool_params(message, tool_class)
             tool = tool_class(**params)
             
-            # Execute tool in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            logger.debug(f"Executing {tool_class.__name__} with params: {params}")
-            result = await loop.run_in_executor(
-                executor,
-                lambda: getattr(self, tool_class.__name__.lower())(tool)
-            )
-            logger.info(f"Tool {tool_class.__name__} execution completed with result: {result}")
+            logger.debug("Executing %s with params: %s", tool_class.__name__, params)
+            async_handler = getattr(self, "a" + tool_class.__name__.lower(), None)
+            if async_handler is not None:
+                # Natively async tools are awaited directly, with no thread hand-off
+                result = await async_handler(tool)
+            else:
+                # Execute tool in thread pool to avoid blocking
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    executor,
+                    lambda: getattr(self, tool_class.__name__.lower())(tool)
+                )
+            logger.debug("Tool %s execution completed with result: %s", tool_class.__name__, result)
             return result
         except Exception as e:
             logger.error(f"Error in async tool execution: {e}")
@@ -320,5 +498,16 @@ ANSWER: [Your synthesized answer]
     # Add method to support both sync and async usage
     def handle_message(self, message: str) -> str:
         """Synchronous wrapper for handle_message_parallel"""
-        return asyncio.run(self.handle_message_parallel(message))
+        future = asyncio.run_coroutine_threadsafe(self.handle_message_parallel(message), self._get_loop())
+        return future.result()
+
+    @classmethod
+    def _get_loop(cls) -> asyncio.AbstractEventLoop:
+        """Get the background event loop shared by all sync callers, starting it once"""
+        with cls._loop_lock:
+            if cls._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="retrieval-agent-loop", daemon=True).start()
+                cls._loop = loop
+            return cls._loop
         
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 from pydantic import BaseModel
 
@@ -17,6 +17,17 @@ class ToolMessage(BaseModel):
     requires_function_call: bool = False
     function_schema: Optional[Dict] = None
 
+    @classmethod
+    def default_value(cls, name: str) -> Any:
+        """The class-level default of a field, or None if it has none
+
+        Pydantic v2 keeps field defaults on model_fields, not as class attributes.
+        """
+        field = cls.model_fields.get(name)
+        if field is None or field.is_required():
+            return None
+        return field.get_default(call_default_factory=True)
+
     @classmethod
     def get_request_type(cls) -> str:
         """Get the request type for this tool"""
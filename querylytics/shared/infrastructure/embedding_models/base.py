@@ -1,12 +1,26 @@
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import Callable, List
+from typing import Callable, List, Optional, Sequence, Tuple
 import numpy as np
 
+from querylytics.shared.infrastructure.utils.cache import TTLCache
+
 logger = logging.getLogger(__name__)
 logging.getLogger("openai").setLevel(logging.ERROR)
 
 
+def quantize_int8(embedding: Sequence[float]) -> Tuple[np.ndarray, np.float32]:
+    """L2-normalize an embedding and symmetrically quantize it to int8 with a per-vector scale"""
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec = vec / norm
+    peak = np.max(np.abs(vec)) if vec.size else 0
+    scale = np.float32(peak / 127) if peak else np.float32(1)
+    return np.round(vec / scale).astype(np.int8), scale
+
+
 class EmbeddingModelsConfig:
     """Configuration for embedding models."""
     model_type: str = "openai"
@@ -18,6 +32,16 @@ class EmbeddingModelsConfig:
 class EmbeddingModel(ABC):
     """Abstract base class for embedding models."""
 
+    # Texts whose embeddings similarities() keeps; probing prompts repeat often
+    SIMILARITY_CACHE_SIZE = 4096
+    # Cached embeddings are kept as int8 plus a scale, a quarter of their float32 size;
+    # set False to keep normalized float32 vectors instead
+    SIMILARITY_CACHE_INT8 = True
+
+    def __init__(self):
+        self._embed: Optional[Callable[[List[str]], List[List[float]]]] = None
+        self._similarity_cache = TTLCache(maxsize=self.SIMILARITY_CACHE_SIZE, ttl=None)
+
     @classmethod
     def create(cls, config: EmbeddingModelsConfig) -> "EmbeddingModel":
         """
@@ -34,6 +58,42 @@ class EmbeddingModel(ABC):
         """Returns a function to compute embeddings."""
         pass
 
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Async embedding; defaults to running embedding_fn in a worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.embedding_fn(), texts)
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts into one contiguous (len(texts), dims) float32 array, in input order
+
+        Texts are sent sorted by length, so each request batch holds texts of
+        similar size and no batch is held up by a single long outlier.
+        """
+        if not texts:
+            return np.zeros((0, self.embedding_dims), dtype=np.float32)
+        if self._embed is None:
+            self._embed = self.embedding_fn()
+        order = self._length_order(texts)
+        return self._restore_order(order, self._embed([texts[i] for i in order]))
+
+    async def aembed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """Async embed_many"""
+        if not texts:
+            return np.zeros((0, self.embedding_dims), dtype=np.float32)
+        order = self._length_order(texts)
+        return self._restore_order(order, await self.aembed([texts[i] for i in order]))
+
+    @staticmethod
+    def _length_order(texts: Sequence[str]) -> List[int]:
+        return sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+    @staticmethod
+    def _restore_order(order: List[int], embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+        sorted_rows = np.asarray(embeddings, dtype=np.float32)
+        rows = np.empty_like(sorted_rows)
+        rows[order] = sorted_rows
+        return rows
+
     @property
     @abstractmethod
     def embedding_dims(self) -> int:
@@ -43,12 +103,60 @@ class EmbeddingModel(ABC):
     def similarity(self, text1: str, text2: str) -> float:
         """Compute cosine similarity between two texts."""
         try:
-            embeddings = self.embedding_fn()([text1, text2])
-            emb1, emb2 = np.array(embeddings[0]), np.array(embeddings[1])
-            similarity = float(
-                np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
-            )
-            return similarity
+            return float(self.similarities([(text1, text2)])[0])
         except Exception as e:
             logger.error(f"Error computing similarity: {e}")
             return 0.0
+
+    def similarities(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        """Cosine similarity of each (text1, text2) pair, embedding every text in one call."""
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+        vectors, scales = zip(*self._cached_entries([text for pair in pairs for text in pair]))
+        if self.SIMILARITY_CACHE_INT8:
+            # Accumulate in int32: int8 products summed over ~1.5k dims overflow int16
+            matrix = np.stack(vectors).astype(np.int32)
+            dots = (matrix[0::2] * matrix[1::2]).sum(axis=1)
+            scales = np.asarray(scales, dtype=np.float32)
+            return dots * scales[0::2] * scales[1::2]
+        # Vectors are stored normalized, so each cosine is a plain dot product of a row pair
+        matrix = np.stack(vectors)
+        return (matrix[0::2] * matrix[1::2]).sum(axis=1)
+
+    def top_k(self, query: str, candidates: Sequence[str], k: int = 5) -> List[Tuple[str, float]]:
+        """The k candidates most similar to the query, best first, with their cosine similarity"""
+        if not candidates or k < 1:
+            return []
+        vectors, scales = zip(*self._cached_entries([query, *candidates]))
+        # Dequantized to float32, the scores are one BLAS matrix-vector product
+        matrix = np.stack(vectors).astype(np.float32)
+        matrix *= np.asarray(scales, dtype=np.float32)[:, np.newaxis]
+        scores = matrix[1:] @ matrix[0]
+        if k < len(scores):
+            # Partition first so only the k winners are sorted
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+        else:
+            best = np.argsort(-scores)
+        return [(candidates[i], float(scores[i])) for i in best]
+
+    def _cached_entries(self, texts: Sequence[str]) -> List[Tuple[np.ndarray, np.float32]]:
+        """The stored (vector, scale) of each text; texts not cached are embedded in one call"""
+        entries = [self._similarity_cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, entry in zip(texts, entries) if entry is None))
+        if missing:
+            embedded = {
+                text: self._cache_entry(vector)
+                for text, vector in zip(missing, self.embed_many(missing))
+            }
+            for text, entry in embedded.items():
+                self._similarity_cache.set(text, entry)
+            entries = [embedded[text] if entry is None else entry for text, entry in zip(texts, entries)]
+        return entries
+
+    def _cache_entry(self, embedding: Sequence[float]) -> Tuple[np.ndarray, np.float32]:
+        """The (vector, scale) pair similarities() stores for an embedding"""
+        if self.SIMILARITY_CACHE_INT8:
+            return quantize_int8(embedding)
+        vec = np.asarray(embedding, dtype=np.float32)
+        return vec / (np.linalg.norm(vec) + 1e-12), np.float32(1)
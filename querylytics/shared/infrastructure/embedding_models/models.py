@@ -1,15 +1,25 @@
+import asyncio
 import os
 import time
-from typing import Callable, List
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List
 import tiktoken
+from openai import AsyncOpenAI
 from querylytics.shared.infrastructure.embedding_models.base import EmbeddingModelsConfig, EmbeddingModel
+from querylytics.shared.infrastructure.language_models.clients import get_async_client, get_client
 from itertools import islice
 
 from typing import Iterable, Sequence, TypeVar
 
 T = TypeVar("T")
 
+
+@lru_cache(maxsize=8)
+def get_encoder(model_name: str) -> tiktoken.Encoding:
+    """Load a model's tokenizer once per process; building the BPE tables is slow"""
+    return tiktoken.encoding_for_model(model_name)
+
 def batched(iterable: Iterable[T], n: int) -> Iterable[Sequence[T]]:
     """
     Batch data into tuples of length n. The last batch may be shorter.
@@ -36,6 +46,11 @@ class OpenAIEmbeddingsConfig(EmbeddingModelsConfig):
     dims: int = 1536
     context_length: int = 8192
     batch_size: int = 16
+    max_concurrency: int = 10  # Batches in flight at once
+    pipeline_depth: int = 4  # Truncated batches aembed prepares ahead of the requests
+    # Seconds per request; the OpenAI SDK's default, since large batches can take
+    # far longer than a chat completion
+    timeout: float = 600
 
 
 class OpenAIEmbeddings(EmbeddingModel):
@@ -49,52 +64,126 @@ class OpenAIEmbeddings(EmbeddingModel):
             raise ValueError(
                 "OPENAI_API_KEY must be set in the environment or passed in the config."
             )
-        self.client = OpenAI(api_key=self.config.api_key)
-        self.tokenizer = tiktoken.encoding_for_model(self.config.model_name)
+        # Pooled clients shared with every model using the same key and timeout
+        self.client = get_client(self.config.api_key, timeout=self.config.timeout)
+        self.tokenizer = get_encoder(self.config.model_name)
+
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        """The shared async client on the running event loop"""
+        return get_async_client(self.config.api_key, timeout=self.config.timeout)
 
     def truncate_texts(self, texts: List[str]) -> List[str]:
-        """Truncate texts to fit the embedding model's context length."""
-        return [
-            self.tokenizer.decode(
-                self.tokenizer.encode(text)[: self.config.context_length]
-            )
-            for text in texts
-        ]
+        """Truncate texts to fit the embedding model's context length.
+
+        Every token covers at least one UTF-8 byte, so a text no longer in bytes
+        than the context length always fits and skips the tokenizer entirely.
+        Only the over-long tail is tokenized, in one batch, and cut to length.
+        """
+        limit = self.config.context_length
+        texts = list(texts)
+        long_idx = [i for i, text in enumerate(texts) if len(text.encode()) > limit]
+        if not long_idx:
+            return texts
+
+        # encode_batch tokenizes in tiktoken's own threads, outside the GIL
+        encoded = self.tokenizer.encode_batch([texts[i] for i in long_idx])
+        for i, tokens in zip(long_idx, encoded):
+            if len(tokens) > limit:
+                texts[i] = self.tokenizer.decode(tokens[:limit])
+        return texts
 
     def embedding_fn(self) -> Callable[[List[str]], List[List[float]]]:
         """
         Returns a function to compute embeddings using OpenAI, with batching and retries.
+        Batches are sent concurrently, up to config.max_concurrency at a time.
 
         Returns:
             Callable[[List[str]], List[List[float]]]: A callable function for embedding computation.
         """
         def compute_embeddings(texts: List[str]) -> List[List[float]]:
             # Truncate texts to the model's maximum context length
-            tokenized_texts = self.truncate_texts(texts)
-            embeddings = []
-
-            # Process texts in batches
-            for batch in batched(tokenized_texts, self.config.batch_size):
-                retry_attempts = 3
-                while retry_attempts > 0:
-                    try:
-                        # Call OpenAI API to generate embeddings
-                        response = self.client.embeddings.create(
-                            input=batch, model=self.config.model_name
-                        )
-                        batch_embeddings = [data["embedding"] for data in response["data"]]
-                        embeddings.extend(batch_embeddings)
-                        break 
-                    except Exception as e:
-                        retry_attempts -= 1
-                        if retry_attempts == 0:
-                            raise RuntimeError(f"Failed to generate embeddings: {e}")
-                        time.sleep(2 ** (3 - retry_attempts))  # Exponential backoff
-
-            return embeddings
+            batches = list(batched(self.truncate_texts(texts), self.config.batch_size))
+            if len(batches) <= 1:
+                return [e for batch in batches for e in self._embed_batch(batch)]
+
+            # Threads only wait on the network here; map keeps the batches in order
+            with ThreadPoolExecutor(max_workers=min(self.config.max_concurrency, len(batches))) as executor:
+                return [e for batch_embeddings in executor.map(self._embed_batch, batches) for e in batch_embeddings]
 
         return compute_embeddings
 
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts from inside an event loop, with batches in flight concurrently
+
+        A producer truncates one batch at a time into a bounded queue, so preparing
+        the next batches overlaps the requests already waiting on the network.
+        """
+        texts = list(texts)
+        batch_size = self.config.batch_size
+        workers = min(self.config.max_concurrency, -(-len(texts) // batch_size))
+        if workers == 0:
+            return []
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.config.pipeline_depth)
+        results: Dict[int, List[List[float]]] = {}
+
+        async def produce() -> None:
+            for index, batch in enumerate(batched(texts, batch_size)):
+                await queue.put((index, self.truncate_texts(batch)))
+            for _ in range(workers):
+                await queue.put(None)
+
+        async def consume() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, batch = item
+                results[index] = await self._aembed_batch(batch)
+
+        tasks = [asyncio.ensure_future(produce())]
+        tasks.extend(asyncio.ensure_future(consume()) for _ in range(workers))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # One failed batch fails the call; stop the rest instead of leaving them blocked
+            for task in tasks:
+                task.cancel()
+            raise
+        # Results are keyed by batch index, so embeddings line up with texts
+        return [e for index in range(len(results)) for e in results[index]]
+
+    def _embed_batch(self, batch: Sequence[str]) -> List[List[float]]:
+        """Embed one batch, retrying with exponential backoff"""
+        retry_attempts = 3
+        while True:
+            try:
+                # Call OpenAI API to generate embeddings
+                response = self.client.embeddings.create(
+                    input=list(batch), model=self.config.model_name
+                )
+                return [data.embedding for data in response.data]
+            except Exception as e:
+                retry_attempts -= 1
+                if retry_attempts == 0:
+                    raise RuntimeError(f"Failed to generate embeddings: {e}")
+                time.sleep(2 ** (3 - retry_attempts))  # Exponential backoff
+
+    async def _aembed_batch(self, batch: Sequence[str]) -> List[List[float]]:
+        """Async _embed_batch; backs off without blocking the event loop"""
+        retry_attempts = 3
+        while True:
+            try:
+                response = await self.aclient.embeddings.create(
+                    input=list(batch), model=self.config.model_name
+                )
+                return [data.embedding for data in response.data]
+            except Exception as e:
+                retry_attempts -= 1
+                if retry_attempts == 0:
+                    raise RuntimeError(f"Failed to generate embeddings: {e}")
+                await asyncio.sleep(2 ** (3 - retry_attempts))  # Exponential backoff
+
     @property
     def embedding_dims(self) -> int:
         return self.config.dims
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from querylytics.shared.infrastructure.language_models.openai_gpt import OpenAIGPT
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingOpenAIGPT:
+    """
+    Coalesces concurrent requests to an OpenAIGPT instance.
+
+    Prompts submitted within a short flush window are dispatched together.
+    The chat endpoint has no native batch API, so chat prompts are fanned out
+    concurrently over the shared async client; embeddings are packed into a
+    single request per batch.
+    """
+
+    def __init__(
+        self,
+        llm: OpenAIGPT,
+        flush_interval_ms: float = 5,
+        max_batch_size: int = 16,
+        embed_batch_size: int = 96,
+        embedding_model: str = "text-embedding-3-small"
+    ):
+        self.llm = llm
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.embed_batch_size = embed_batch_size
+        self.embedding_model = embedding_model
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def generate(self, prompt: Union[str, List[Dict[str, str]]]) -> Dict[str, str]:
+        """Queue a prompt and wait for its response"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, future))
+        return await future
+
+    async def generate_many(self, prompts: List[str]) -> List[Dict[str, str]]:
+        """Generate responses for several prompts concurrently"""
+        return await asyncio.gather(*(self.llm.agenerate(p) for p in prompts))
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with one API call per embed_batch_size texts"""
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), self.embed_batch_size):
+            response = await self.llm.aclient.embeddings.create(
+                model=self.embedding_model,
+                input=texts[start:start + self.embed_batch_size]
+            )
+            embeddings.extend(item.embedding for item in response.data)
+        return embeddings
+
+    def _ensure_worker(self) -> None:
+        """Start the flush worker on the running loop if needed"""
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not asyncio.get_running_loop():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        """Drain the queue in batches of up to max_batch_size per flush window"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[Union[str, List[Dict[str, str]]], asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            logger.debug("Flushing batch of %d prompts", len(batch))
+            # Dispatched without waiting, so prompts arriving while this batch is in
+            # flight form the next batch instead of queueing behind its slowest reply
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Union[str, List[Dict[str, str]]], asyncio.Future]]) -> None:
+        """Send one batch's prompts concurrently and resolve their futures"""
+        results = await asyncio.gather(
+            *(self.llm.agenerate(prompt) for prompt, _ in batch),
+            return_exceptions=True
+        )
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,47 @@
+from typing import Any, Dict, List, Optional, Union
+
+from querylytics.shared.infrastructure.utils.cache import TTLCache, make_cache_key
+
+
+class LLMCache:
+    """
+    Exact-match cache of LLM responses, keyed on everything that shapes a completion.
+
+    Args:
+        maxsize: Maximum number of responses kept before evicting the least recently used.
+        ttl: Seconds a response stays valid; None keeps responses until evicted.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: Optional[float] = 3600.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def key(
+        model: str,
+        prompt: Union[str, List[Dict[str, str]]],
+        functions: Optional[List[Dict]] = None,
+        function_call: Optional[Dict] = None,
+        temperature: float = 0.0,
+        **params: Any
+    ) -> str:
+        """Hash a request; extra params (seed, system prompt, ...) are part of the key"""
+        return make_cache_key(
+            model=model,
+            prompt=prompt,
+            functions=functions,
+            function_call=function_call,
+            temperature=temperature,
+            **params
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(key)
+
+    def set(self, key: str, response: Dict[str, Any]) -> None:
+        self._cache.set(key, response)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
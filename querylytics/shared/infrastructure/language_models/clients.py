@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+try:
+    import h2  # noqa: F401  httpx only speaks HTTP/2 with the h2 package installed
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+# Clients are shared by (api_key, api_base, organization, timeout) so every LLM and
+# embedding model with the same credentials and timeout reuses one connection pool.
+# An httpx async pool belongs to the loop it was first used on, so async clients are
+# also kept per event loop; a loop's clients go away with it
+_CLIENT_CACHE: Dict[Tuple, OpenAI] = {}
+_ASYNC_CLIENT_CACHE: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+_lock = threading.Lock()
+
+
+def get_client(
+    api_key: str, api_base: Optional[str] = None, organization: str = "", timeout: float = 20
+) -> OpenAI:
+    """Get the process-wide sync client for these credentials and timeout"""
+    key = (api_key, api_base, organization, timeout)
+    with _lock:
+        client = _CLIENT_CACHE.get(key)
+        if client is None:
+            client = _CLIENT_CACHE[key] = OpenAI(
+                api_key=api_key,
+                base_url=api_base,
+                organization=organization or None,
+                http_client=httpx.Client(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=timeout)
+            )
+        return client
+
+
+def get_async_client(
+    api_key: str, api_base: Optional[str] = None, organization: str = "", timeout: float = 20
+) -> AsyncOpenAI:
+    """Get the async client for these credentials and timeout on the running event loop"""
+    loop = asyncio.get_running_loop()
+    key = (api_key, api_base, organization, timeout)
+    with _lock:
+        clients = _ASYNC_CLIENT_CACHE.get(loop)
+        if clients is None:
+            clients = _ASYNC_CLIENT_CACHE[loop] = {}
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = AsyncOpenAI(
+                api_key=api_key,
+                base_url=api_base,
+                organization=organization or None,
+                http_client=httpx.AsyncClient(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=timeout)
+            )
+        return client
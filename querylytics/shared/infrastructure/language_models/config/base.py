@@ -1,12 +1,30 @@
 from abc import ABC, abstractmethod
-from pydantic import BaseModel
-from typing import Dict, Optional
 from enum import Enum
-from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import asyncio
 import json
 
+import orjson
+
+
+def _dumps(value: Any) -> str:
+    return orjson.dumps(value).decode()
+
+# Bound once; messages are stamped on every construction
+_utcnow = partial(datetime.now, timezone.utc)
+
+class StreamError(str):
+    """
+    The error text a stream yields in place of the rest of a failed response.
+
+    It is still a str, so it displays like any other piece, but callers that
+    cache streamed answers check for it and skip caching the partial text.
+    """
+
+
 class LLMConfig(BaseModel):
     """Base configuration for all LLMs."""
     model_type: str = "openai"
@@ -43,10 +61,41 @@ class LanguageModel(ABC):
         self, 
         prompt: str,
         functions: Optional[List[Dict]] = None,
-        function_call: Optional[Dict] = None
+        function_call: Optional[Dict] = None,
+        use_cache: Optional[bool] = None
     ) -> dict:
         pass
 
+    def is_deterministic(self) -> bool:
+        """Whether sampling is deterministic, so a prompt's answer can be reused by default"""
+        return self.config.temperature == 0
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Stream a response; defaults to yielding the full generate() result"""
+        message = self.generate(prompt).get("message", "")
+        yield StreamError(message) if message.startswith("Error:") else message
+
+    async def agenerate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Async generate_stream; defaults to yielding the full agenerate() result"""
+        message = (await self.agenerate(prompt)).get("message", "")
+        yield StreamError(message) if message.startswith("Error:") else message
+
+    async def agenerate(
+        self,
+        prompt: str,
+        functions: Optional[List[Dict]] = None,
+        function_call: Optional[Dict] = None,
+        use_cache: Optional[bool] = None
+    ) -> dict:
+        """Async generate; defaults to running the sync call in a worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self.generate(
+                prompt, functions=functions, function_call=function_call, use_cache=use_cache
+            )
+        )
+
 class Role(str, Enum):
     """
     Possible roles for a message in a chat.
@@ -62,15 +111,18 @@ class LLMMessage(BaseModel):
     """
     Represents a message in the interaction history sent to the LLM API.
     It can be a user message, an assistant response, or a tool/function call.
+    Messages are immutable, so history snapshots can share them instead of copying.
     """
 
+    model_config = ConfigDict(frozen=True)
+
     role: str  # Role can be "user", "assistant", or "system".
     content: str
     name: Optional[str] = None
     tool_call_id: Optional[str] = None
     function_call: Optional[Dict[str, Any]] = None
     tool_calls: Optional[List[Dict[str, Any]]] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=_utcnow)
 
     def api_dict(self, has_system_role: bool = True) -> Dict[str, Any]:
         """
@@ -81,18 +133,18 @@ class LLMMessage(BaseModel):
         Returns:
             Dict[str, Any]: Dictionary representation for API usage.
         """
-        d = self.dict(exclude_none=True)
+        d = self.model_dump(exclude_none=True)
         if not has_system_role and d.get("role") == "system":
             d["role"] = "user"
             d["content"] = f"[SYSTEM MESSAGE]:\n{d['content']}"
 
         # Ensure API compatibility
         if "function_call" in d:
-            d["function_call"]["arguments"] = json.dumps(d["function_call"]["arguments"])
+            d["function_call"]["arguments"] = _dumps(d["function_call"]["arguments"])
         if "tool_calls" in d:
             for tc in d["tool_calls"]:
                 if "arguments" in tc.get("function", {}):
-                    tc["function"]["arguments"] = json.dumps(tc["function"]["arguments"])
+                    tc["function"]["arguments"] = _dumps(tc["function"]["arguments"])
 
         # Drop unnecessary fields
         d.pop("timestamp", None)
@@ -1,11 +1,19 @@
+import asyncio
 import logging
 import os
+import threading
 
-from typing import Optional, Dict, List, Union
-from enum import Enum
+from functools import lru_cache
+from typing import AsyncIterator, Iterator, Optional, Dict, List, Tuple, Union
 
-from querylytics.shared.infrastructure.language_models.config.base import LLMConfig, LanguageModel
-from openai import OpenAI, OpenAIError
+from pydantic import Field
+
+from querylytics.shared.infrastructure.language_models.cache import LLMCache
+from querylytics.shared.infrastructure.language_models.clients import get_async_client, get_client
+from querylytics.shared.infrastructure.language_models.config.base import LLMConfig, LanguageModel, StreamError
+from querylytics.shared.infrastructure.language_models.semantic_cache import SemanticCache, SemanticCacheConfig
+from querylytics.shared.infrastructure.utils.cache import make_cache_key
+from openai import AsyncOpenAI, OpenAI, OpenAIError
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -13,12 +21,15 @@ logger.setLevel(logging.INFO)
 from dotenv import load_dotenv  
 load_dotenv()
 
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-
+# Response caches are shared by (size, ttl), so a repeat hits the cache whichever
+# agent's instance sent the original request
+_RESPONSE_CACHES: Dict[Tuple, LLMCache] = {}
+# Distinct message prefixes (system prompts, ...) given their own semantic cache
+_MAX_SEMANTIC_SCOPES = 64
 
 
-class OpenAIChatModel(str, Enum):
-    """Enum for OpenAI Chat models"""
+class OpenAIChatModel:
+    """OpenAI chat model names, kept as plain strings so configs validate them as str"""
 
     GPT3_5_TURBO = "gpt-3.5-turbo-1106"
     GPT4 = "gpt-4"
@@ -31,7 +42,7 @@ class OpenAIChatModel(str, Enum):
 
 class OpenAIGPTConfig(LLMConfig):
     type: str = "openai"
-    api_key: str = OPENAI_API_KEY 
+    api_key: str = Field(default_factory=lambda: os.environ.get("OPENAI_API_KEY", ""))
     organization: str = ""
     api_base: Optional[str] = None
     timeout: int = 20
@@ -40,6 +51,11 @@ class OpenAIGPTConfig(LLMConfig):
     chat_model: str = OpenAIChatModel.GPT4_TURBO
     completion_model: str = OpenAIChatModel.GPT4_TURBO
     supports_json_schema: Optional[bool] = None
+    cache_size: int = 10_000  # Max responses in the shared response cache; 0 disables caching
+    cache_ttl: float = 3600.0  # Seconds a cached response stays valid
+    semantic_cache: SemanticCacheConfig = Field(default_factory=SemanticCacheConfig)
+    max_concurrency: int = 8  # Max in-flight async requests per instance
+    system_prompt: str = ""  # Static prefix sent ahead of every string prompt
 
 
 class OpenAIGPT(LanguageModel):
@@ -49,56 +65,349 @@ class OpenAIGPT(LanguageModel):
 
     def __init__(self, config: OpenAIGPTConfig):
         super().__init__(config)
-        self.client = OpenAI(api_key=config.api_key)  # Initialize the client
+        self.client = self._get_client(config)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Exact-key response cache; exceptions are never cached, so failed calls are retried
+        self.response_cache = self._get_response_cache(config) if config.cache_size > 0 else None
+        # One semantic cache per message prefix: only prompts whose final user message
+        # follows identical instructions are comparable. None when disabled
+        self.semantic_caches: Optional[Dict[str, SemanticCache]] = (
+            {} if config.semantic_cache.enabled else None
+        )
+        self._semantic_cache_key = None
+        # generate runs in executor threads too; guards the scope dict and the caches in it
+        self._semantic_lock = threading.Lock()
+        self._embed = lru_cache(maxsize=config.semantic_cache.max_entries)(self._embed_uncached)
+
+    @staticmethod
+    def _get_client(config: OpenAIGPTConfig) -> OpenAI:
+        """Get the shared sync client for this config's credentials"""
+        return get_client(config.api_key, config.api_base, config.organization, config.timeout)
+
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        """The shared async client for this config's credentials on the running event loop"""
+        config = self.config
+        return get_async_client(config.api_key, config.api_base, config.organization, config.timeout)
+
+    @staticmethod
+    def _get_response_cache(config: OpenAIGPTConfig) -> LLMCache:
+        """Get the process-wide response cache for this config's size and ttl"""
+        key = (config.cache_size, config.cache_ttl)
+        if key not in _RESPONSE_CACHES:
+            _RESPONSE_CACHES[key] = LLMCache(maxsize=config.cache_size, ttl=config.cache_ttl)
+        return _RESPONSE_CACHES[key]
+
+    def _use_cache(self, use_cache: Optional[bool]) -> bool:
+        """Responses are cached when sampling is deterministic, unless the caller decides"""
+        if self.response_cache is None:
+            return False
+        return self.is_deterministic() if use_cache is None else use_cache
+
+    def _response_cache_key(
+        self,
+        prompt: Union[str, List[Dict[str, str]]],
+        functions: Optional[List[Dict]],
+        function_call: Optional[Dict]
+    ) -> str:
+        # Key on everything that influences the completion so config changes
+        # never return a stale answer
+        return LLMCache.key(
+            self.config.chat_model,
+            prompt,
+            functions,
+            function_call,
+            self.config.temperature,
+            seed=self.config.seed,
+            system_prompt=self.config.system_prompt
+        )
 
-    def generate(self, prompt: Union[str, List[Dict[str, str]]], functions: Optional[List[Dict]] = None, function_call: Optional[Dict] = None) -> Dict[str, str]:
+    def generate(
+        self,
+        prompt: Union[str, List[Dict[str, str]]],
+        functions: Optional[List[Dict]] = None,
+        function_call: Optional[Dict] = None,
+        use_cache: Optional[bool] = None
+    ) -> Dict[str, str]:
         """
         Generate a response for a given prompt.
         Args:
             prompt: Either a string prompt or a list of message dictionaries.
             functions: Optional list of function definitions for function calling.
             function_call: Optional specification of function to call.
+            use_cache: Serve and store the response in the response caches. Defaults
+                to caching only when temperature is 0.
         Returns:
             A dictionary containing the response text and additional metadata.
         """
         try:
-            # Build the request parameters
-            params = {
-                "model": self.config.chat_model,
-                "messages": [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt,
-                "temperature": self.config.temperature,
-                "timeout": self.config.timeout,
-                "seed": self.config.seed,
-            }
+            if not self._use_cache(use_cache):
+                return self._generate_uncached(prompt, functions, function_call)
+
+            embedding = None
+            semantic_cache, text = self._semantic_cache_for(prompt) if not functions else (None, None)
+            if semantic_cache is not None:
+                embedding = self._semantic_lookup_embedding(text)
+                if embedding is not None:
+                    with self._semantic_lock:
+                        cached = semantic_cache.lookup(embedding)
+                    if cached is not None:
+                        return dict(cached)
 
-            # Add function calling parameters if provided
-            if functions:
-                params["functions"] = functions
-            if function_call:
-                params["function_call"] = function_call
-
-            response = self.client.chat.completions.create(**params)
-            
-            if hasattr(response.choices[0], "message"):
-                message = response.choices[0].message
-                # Handle function calls in response
-                if hasattr(message, "function_call"):
-                    return {
-                        "message": message.content,
-                        "function_call": message.function_call,
-                        "usage": getattr(response, "usage", {})
-                    }
-                return {"message": message.content.strip(), "usage": getattr(response, "usage", {})}
-            else:
-                return {"message": response.choices[0].text.strip(), "usage": getattr(response, "usage", {})}
+            key = self._response_cache_key(prompt, functions, function_call)
+            response = self.response_cache.get(key)
+            if response is None:
+                response = self._generate_uncached(prompt, functions, function_call)
+                self.response_cache.set(key, response)
+            if embedding is not None:
+                with self._semantic_lock:
+                    semantic_cache.add(embedding, response)
+            # Callers may reassign keys on the result, so hand out a shallow snapshot
+            # rather than the cached dict itself
+            return dict(response)
         except OpenAIError as e:
-            logger.error(f"OpenAI API error: {e}")
+            logger.error("OpenAI API error: %s", e)
             return {"message": "Error: OpenAI API error occurred."}
         except TimeoutError as e:
-            logger.error(f"Request timed out: {e}")
+            logger.error("Request timed out: %s", e)
             return {"message": "Error: Request timed out."}
         except Exception as e:
-            logger.error(f"Unexpected error: {e}")
+            logger.error("Unexpected error: %s", e)
             return {"message": "Error: An unexpected error occurred."}
-    
-    
\ No newline at end of file
+
+    def _semantic_cache_for(
+        self, prompt: Union[str, List[Dict[str, str]]]
+    ) -> Tuple[Optional[SemanticCache], Optional[str]]:
+        """The semantic cache a prompt belongs to and the text to embed for it
+
+        A string prompt is embedded as is. A message list is embedded by its final
+        user message and scoped by every message before it. Other prompts are not
+        semantically cached.
+        """
+        if self.semantic_caches is None:
+            return None, None
+        if isinstance(prompt, str):
+            scope, text = "", prompt
+        elif prompt and prompt[-1].get("role") == "user":
+            scope, text = make_cache_key(messages=prompt[:-1]), prompt[-1]["content"]
+        else:
+            return None, None
+
+        # Answers generated under a different model/sampling setup must not be reused
+        cache_key = (
+            self.config.chat_model,
+            self.config.temperature,
+            self.config.seed,
+            self.config.system_prompt
+        )
+        with self._semantic_lock:
+            if cache_key != self._semantic_cache_key:
+                self.semantic_caches.clear()
+                self._semantic_cache_key = cache_key
+
+            cache = self.semantic_caches.get(scope)
+            if cache is None:
+                if len(self.semantic_caches) >= _MAX_SEMANTIC_SCOPES:
+                    # Dicts keep insertion order; drop the oldest scope
+                    del self.semantic_caches[next(iter(self.semantic_caches))]
+                cache = SemanticCache(
+                    threshold=self.config.semantic_cache.threshold,
+                    max_entries=self.config.semantic_cache.max_entries
+                )
+                self.semantic_caches[scope] = cache
+        return cache, text
+
+    def _semantic_lookup_embedding(self, prompt: str) -> Optional[tuple]:
+        """Embed a prompt for semantic cache lookup, or None if embedding fails"""
+        try:
+            return self._embed(prompt)
+        except Exception as e:
+            logger.warning("Skipping semantic cache, embedding failed: %s", e)
+            return None
+
+    def _embed_uncached(self, text: str) -> tuple:
+        """Embed a single text with the semantic cache embedding model"""
+        response = self.client.embeddings.create(
+            model=self.config.semantic_cache.embedding_model,
+            input=text
+        )
+        return tuple(response.data[0].embedding)
+
+    def generate_stream(self, prompt: Union[str, List[Dict[str, str]]]) -> Iterator[str]:
+        """
+        Stream a response for a given prompt, yielding text as it arrives.
+        Streamed responses bypass the response caches.
+        """
+        try:
+            stream = self.client.chat.completions.create(
+                **self._build_params(prompt),
+                stream=True
+            )
+            for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        except OpenAIError as e:
+            logger.error("OpenAI API error: %s", e)
+            yield StreamError("Error: OpenAI API error occurred.")
+        except Exception as e:
+            logger.error("Unexpected error: %s", e)
+            yield StreamError("Error: An unexpected error occurred.")
+
+    async def agenerate_stream(self, prompt: Union[str, List[Dict[str, str]]]) -> AsyncIterator[str]:
+        """
+        Async generate_stream; the stream holds a config.max_concurrency slot
+        until it is exhausted. Streamed responses bypass the response caches.
+        """
+        try:
+            async with self._get_semaphore():
+                stream = await self.aclient.chat.completions.create(
+                    **self._build_params(prompt),
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices:
+                        yield chunk.choices[0].delta.content or ""
+        except OpenAIError as e:
+            logger.error("OpenAI API error: %s", e)
+            yield StreamError("Error: OpenAI API error occurred.")
+        except Exception as e:
+            logger.error("Unexpected error: %s", e)
+            yield StreamError("Error: An unexpected error occurred.")
+
+    async def agenerate(
+        self,
+        prompt: Union[str, List[Dict[str, str]]],
+        functions: Optional[List[Dict]] = None,
+        function_call: Optional[Dict] = None,
+        use_cache: Optional[bool] = None
+    ) -> Dict[str, str]:
+        """
+        Async variant of generate, for callers running inside an event loop.
+        Concurrent calls are bounded by config.max_concurrency. Shares the
+        response caches with generate; the semantic cache lookup embeds the
+        prompt in a worker thread.
+        """
+        try:
+            key = None
+            embedding = None
+            semantic_cache = None
+            if self._use_cache(use_cache):
+                semantic_cache, text = self._semantic_cache_for(prompt) if not functions else (None, None)
+                if semantic_cache is not None:
+                    embedding = await asyncio.get_running_loop().run_in_executor(
+                        None, self._semantic_lookup_embedding, text
+                    )
+                    if embedding is not None:
+                        with self._semantic_lock:
+                            cached = semantic_cache.lookup(embedding)
+                        if cached is not None:
+                            return dict(cached)
+
+                key = self._response_cache_key(prompt, functions, function_call)
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    if embedding is not None:
+                        with self._semantic_lock:
+                            semantic_cache.add(embedding, cached)
+                    return dict(cached)
+
+            async with self._get_semaphore():
+                response = await self.aclient.chat.completions.create(
+                    **self._build_params(prompt, functions, function_call)
+                )
+            result = self._parse_response(response)
+            if key is not None:
+                self.response_cache.set(key, result)
+                if embedding is not None:
+                    with self._semantic_lock:
+                        semantic_cache.add(embedding, result)
+                return dict(result)
+            return result
+        except OpenAIError as e:
+            logger.error("OpenAI API error: %s", e)
+            return {"message": "Error: OpenAI API error occurred."}
+        except TimeoutError as e:
+            logger.error("Request timed out: %s", e)
+            return {"message": "Error: Request timed out."}
+        except Exception as e:
+            logger.error("Unexpected error: %s", e)
+            return {"message": "Error: An unexpected error occurred."}
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the concurrency semaphore bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _generate_uncached(
+        self,
+        prompt: Union[str, List[Dict[str, str]]],
+        functions: Optional[List[Dict]] = None,
+        function_call: Optional[Dict] = None
+    ) -> Dict[str, str]:
+        """Issue one chat completion request."""
+        response = self.client.chat.completions.create(
+            **self._build_params(prompt, functions, function_call)
+        )
+        return self._parse_response(response)
+
+    def _build_params(
+        self,
+        prompt: Union[str, List[Dict[str, str]]],
+        functions: Optional[List[Dict]] = None,
+        function_call: Optional[Dict] = None,
+        system_prompt: Optional[str] = None,
+        **overrides
+    ) -> Dict:
+        """Build chat completion request parameters"""
+        if isinstance(prompt, str):
+            # The system prompt always leads, byte-identical across calls, so the
+            # provider can reuse its cached prefill for it
+            if system_prompt is None:
+                system_prompt = self.config.system_prompt
+            messages = [{"role": "user", "content": prompt}]
+            if system_prompt:
+                messages.insert(0, {"role": "system", "content": system_prompt})
+        else:
+            messages = prompt
+        params = {
+            "model": self.config.chat_model,
+            "messages": messages,
+            "temperature": self.config.temperature,
+            "timeout": self.config.timeout,
+            "seed": self.config.seed,
+        }
+        params.update(overrides)
+
+        # Add function calling parameters if provided
+        if functions:
+            params["functions"] = functions
+        if function_call:
+            params["function_call"] = function_call
+        return params
+
+    @staticmethod
+    def _parse_response(response) -> Dict[str, str]:
+        """Convert a chat completion into the response dictionary"""
+        # A plain dict, dumped once, rather than the SDK object every cache copy would hold
+        usage = response.usage.model_dump() if response.usage else {}
+        choice = response.choices[0]
+        try:
+            message = choice.message
+        except AttributeError:
+            return {"message": choice.text.strip(), "usage": usage}
+        # Handle function calls in response
+        if message.function_call is not None:
+            # A plain dict, so callers can index function_call["arguments"]
+            return {
+                "message": message.content,
+                "function_call": {
+                    "name": message.function_call.name,
+                    "arguments": message.function_call.arguments
+                },
+                "usage": usage
+            }
+        return {"message": (message.content or "").strip(), "usage": usage}
@@ -0,0 +1,145 @@
+import logging
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from querylytics.shared.infrastructure.embedding_models.base import quantize_int8
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per step of a lookup; bounds the float32 working copy to this many
+# rows instead of a widened copy of the whole matrix
+_LOOKUP_BLOCK_ROWS = 256
+# Rows allocated on the first insert
+_INITIAL_ROWS = 64
+
+
+class SemanticCacheConfig(BaseModel):
+    """Configuration for the embedding-similarity response cache"""
+    enabled: bool = False
+    threshold: float = 0.95  # Minimum cosine similarity for a hit
+    max_entries: int = 1024
+    embedding_model: str = "text-embedding-3-small"
+
+
+class SemanticCache:
+    """
+    In-memory cache that looks up values by cosine similarity of their embeddings.
+
+    Embeddings are L2-normalized and quantized to int8 with a per-vector
+    scale on insert, so the stored matrix is a quarter of its float32 size.
+    A lookup scores every entry in blocks, never widening the whole matrix.
+    When full, an expired entry is replaced first, else the least recently
+    used one. With a ttl, entries older than ttl seconds are never returned.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Rows are filled in place; capacity doubles up to max_entries when full,
+        # so filling the cache copies the matrix O(log n) times, not once per insert
+        self._matrix: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._last_used: Optional[np.ndarray] = None
+        self._stored_at: Optional[np.ndarray] = None
+        self._values: List[Any] = []
+        self._size = 0
+        self._clock = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _quantize(embedding: Sequence[float]) -> Tuple[np.ndarray, np.float32]:
+        """Normalize and symmetrically quantize an embedding to int8"""
+        return quantize_int8(embedding)
+
+    def lookup(self, embedding: Sequence[float]) -> Optional[Any]:
+        """Return the value of the most similar entry, or None below threshold"""
+        if not self._size:
+            return None
+
+        query, query_scale = self._quantize(embedding)
+        scores = self._dots(query) * self._scales[:self._size] * query_scale
+        if self.ttl is not None:
+            scores[self._expired()] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+
+        self._clock += 1
+        self._last_used[best] = self._clock
+        logger.debug("Semantic cache hit (similarity=%.3f)", scores[best])
+        return self._values[best]
+
+    def _dots(self, query: np.ndarray) -> np.ndarray:
+        """Dot products of the quantized query with every stored row
+
+        The int8 matrix stays as stored: it is widened to float32 one block of
+        rows at a time for a BLAS product. Integer dot products up to 127² · dims
+        are all but exact in float32, far below the quantization error.
+        """
+        query = query.astype(np.float32)
+        rows = self._size
+        dots = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, _LOOKUP_BLOCK_ROWS):
+            block = self._matrix[start:min(start + _LOOKUP_BLOCK_ROWS, rows)]
+            dots[start:start + len(block)] = block.astype(np.float32) @ query
+        return dots
+
+    def _expired(self) -> np.ndarray:
+        """Mask of the stored entries older than ttl"""
+        return self._stored_at[:self._size] < time.monotonic() - self.ttl
+
+    def add(self, embedding: Sequence[float], value: Any) -> None:
+        """Store a value under the given embedding"""
+        vec, scale = self._quantize(embedding)
+        if self._matrix is None:
+            self._allocate(min(self.max_entries, _INITIAL_ROWS), len(vec))
+        elif self._size == len(self._matrix) < self.max_entries:
+            self._allocate(min(self.max_entries, 2 * self._size), len(vec))
+
+        if self._size < self.max_entries:
+            idx = self._size
+            self._size += 1
+            self._values.append(value)
+        else:
+            idx = self._eviction_slot()
+            self._values[idx] = value
+
+        self._clock += 1
+        self._matrix[idx] = vec
+        self._scales[idx] = scale
+        self._last_used[idx] = self._clock
+        self._stored_at[idx] = time.monotonic()
+
+    def _allocate(self, rows: int, dims: int) -> None:
+        """Resize the row storage to `rows`, keeping the stored entries"""
+        matrix = np.zeros((rows, dims), dtype=np.int8)
+        scales = np.zeros(rows, dtype=np.float32)
+        last_used = np.zeros(rows, dtype=np.int64)
+        stored_at = np.zeros(rows, dtype=np.float64)
+        if self._matrix is not None:
+            n = self._size
+            matrix[:n] = self._matrix[:n]
+            scales[:n] = self._scales[:n]
+            last_used[:n] = self._last_used[:n]
+            stored_at[:n] = self._stored_at[:n]
+        self._matrix, self._scales = matrix, scales
+        self._last_used, self._stored_at = last_used, stored_at
+
+    def _eviction_slot(self) -> int:
+        """The slot a full cache overwrites: an expired entry if any, else the least recently used"""
+        if self.ttl is not None:
+            expired = self._expired()
+            if expired.any():
+                return int(np.argmax(expired))
+        return int(np.argmin(self._last_used[:self._size]))
+
+    def clear(self) -> None:
+        """Drop all cached entries; the allocated rows are kept for reuse"""
+        self._values = []
+        self._size = 0
@@ -1,28 +1,84 @@
-from pymongo import MongoClient
-from typing import Dict, Any
+from pymongo import InsertOne, MongoClient, WriteConcern
+from typing import Dict, Any, List, Optional, Sequence
+import atexit
 import logging
+import threading
 from urllib.parse import quote_plus
 
 logger = logging.getLogger(__name__)
 
+# Wire compression for the verbose feedback documents; zstd needs the zstandard package
+try:
+    import zstandard  # noqa: F401
+    _COMPRESSORS = "zstd,zlib"
+except ImportError:
+    _COMPRESSORS = "zlib"
+
+# One pooled client per connection string, shared by every tool in the process
+_clients: Dict[str, MongoClient] = {}
+_clients_lock = threading.Lock()
+
+def _get_client(connection_string: str, max_pool_size: int, min_pool_size: int) -> MongoClient:
+    """The shared client for a connection string; the first caller's pool sizes are kept"""
+    with _clients_lock:
+        client = _clients.get(connection_string)
+        if client is None:
+            client = MongoClient(
+                connection_string,
+                maxPoolSize=max_pool_size,
+                minPoolSize=min_pool_size,
+                compressors=_COMPRESSORS
+            )
+            _clients[connection_string] = client
+        return client
+
+@atexit.register
+def _close_clients() -> None:
+    """Close the shared clients at interpreter exit, ending their monitor threads and sockets"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
 class MongoDBTool:
-    def __init__(self, username: str, password: str, cluster_url: str, database: str, collection: str):
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        cluster_url: str,
+        database: str,
+        collection: str,
+        max_pool_size: int = 20,
+        min_pool_size: int = 2,
+        fast_insert: bool = False,
+        journal: bool = True
+    ):
         if not all([username, password, cluster_url]):
             raise ValueError("MongoDB connection requires username, password, and cluster_url")
         # Construct the MongoDB Atlas connection string
         escaped_username = quote_plus(username)
         escaped_password = quote_plus(password)
         connection_string = f"mongodb+srv://{escaped_username}:{escaped_password}@{cluster_url}/?retryWrites=true&w=majority"
-        self.client = MongoClient(connection_string)
+        self.client = _get_client(connection_string, max_pool_size, min_pool_size)
         self.db = self.client[database]
         self.collection = self.db[collection]
+        if fast_insert:
+            # Unacknowledged writes: no round-trip waits for the server's ack, but
+            # failed inserts go unreported. Only for bulk loads that can tolerate it
+            self.collection = self.collection.with_options(write_concern=WriteConcern(w=0))
+        elif not journal:
+            # Acknowledged by the primary without waiting for its journal fsync; fits
+            # analytics collections where a write lost to a crash is acceptable
+            self.collection = self.collection.with_options(write_concern=WriteConcern(w=1, j=False))
+        self._writer: Optional["BufferedMongoWriter"] = None
+        self._writer_lock = threading.Lock()
         logger.info(f"Initialized MongoDB connection to {database}.{collection}")
 
     def insert_document(self, document: Dict[str, Any]):
         """Insert a document into the collection"""
-        logger.info("Starting insert_document with document: %s", document)
+        logger.debug("Starting insert_document with document: %s", document)
         try:
-            logger.info("Attempting MongoDB insertion...")
+            logger.debug("Attempting MongoDB insertion...")
             result = self.collection.insert_one(document)
             logger.info("MongoDB insertion successful with ID: %s", result.inserted_id)
             return result
@@ -30,10 +86,141 @@ class MongoDBTool:
             logger.error("MongoDB insertion failed: %s", str(e), exc_info=True)
             raise
 
-    def find_documents(self, query: Dict[str, Any]):
-        """Find documents matching the query"""
-        return self.collection.find(query)
+    def insert_many(self, documents: List[Dict[str, Any]]):
+        """Insert many documents in one round-trip"""
+        logger.info("Starting insert_many with %d documents", len(documents))
+        try:
+            # Unordered, so one bad document doesn't stop the rest of the batch
+            result = self.collection.insert_many(documents, ordered=False)
+            logger.info("MongoDB bulk insertion successful with %d IDs", len(result.inserted_ids))
+            return result
+        except Exception as e:
+            logger.error("MongoDB bulk insertion failed: %s", str(e), exc_info=True)
+            raise
+
+    def bulk_write(self, operations: Sequence[Any]):
+        """Run InsertOne/UpdateOne/... operations in as few round-trips as the server allows"""
+        logger.info("Starting bulk_write with %d operations", len(operations))
+        try:
+            result = self.collection.bulk_write(list(operations), ordered=False)
+            logger.debug("MongoDB bulk write finished")
+            return result
+        except Exception as e:
+            logger.error("MongoDB bulk write failed: %s", str(e), exc_info=True)
+            raise
+
+    def buffered_writer(
+        self, batch_size: int = 500, flush_interval: Optional[float] = None
+    ) -> "BufferedMongoWriter":
+        """A writer that collects inserts and sends them batch_size at a time"""
+        return BufferedMongoWriter(self, batch_size, flush_interval)
+
+    def insert_document_buffered(
+        self, document: Dict[str, Any], batch_size: int = 100, flush_interval: float = 0.2
+    ) -> None:
+        """Queue a document for the tool's shared background writer and return immediately
+
+        Queued documents are written together once batch_size of them are waiting
+        or flush_interval seconds have passed. The writer is created on first use
+        with these settings and flushed at interpreter exit. A write triggered by a
+        full batch raises to the caller that filled it; a failed periodic write is
+        only logged.
+        """
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = BufferedMongoWriter(self, batch_size, flush_interval)
+        self._writer.insert(document)
+
+    def flush(self) -> None:
+        """Write any documents queued by insert_document_buffered"""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def find_documents(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+        limit: int = 0
+    ):
+        """Find documents matching the query
+
+        Returns a cursor; iterate it to stream results batch_size documents per
+        round-trip. projection limits the fields the server sends, and a limit
+        of 0 means no limit.
+        """
+        return self.collection.find(query, projection=projection).batch_size(batch_size).limit(limit)
 
     def update_document(self, query: Dict[str, Any], update: Dict[str, Any]):
         """Update documents matching the query"""
-        return self.collection.update_one(query, {"$set": update}) 
\ No newline at end of file
+        return self.collection.update_one(query, {"$set": update})
+
+
+class BufferedMongoWriter:
+    """
+    Collects documents and writes them with one bulk_write per batch_size documents.
+
+    With a flush_interval, a background thread also writes whatever is queued
+    every flush_interval seconds, so a slow trickle of documents isn't held
+    back waiting for a full batch. Anything still queued is flushed at
+    interpreter exit, but use as a context manager so the final partial batch
+    is written as soon as you are done:
+
+        with tool.buffered_writer() as writer:
+            for document in documents:
+                writer.insert(document)
+    """
+
+    def __init__(self, tool: MongoDBTool, batch_size: int = 500, flush_interval: Optional[float] = None):
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least one")
+        self.tool = tool
+        self.batch_size = batch_size
+        self._operations: List[InsertOne] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        # Registered after _close_clients, so atexit (last in, first out) flushes
+        # the queue while the shared client is still open
+        atexit.register(self.close)
+        if flush_interval is not None:
+            threading.Thread(
+                target=self._flush_periodically, args=(flush_interval,),
+                name="mongodb-flush", daemon=True
+            ).start()
+
+    def insert(self, document: Dict[str, Any]) -> None:
+        """Queue a document, writing the batch once it is full"""
+        with self._lock:
+            self._operations.append(InsertOne(document))
+            if len(self._operations) < self.batch_size:
+                return
+            operations, self._operations = self._operations, []
+        self.tool.bulk_write(operations)
+
+    def flush(self) -> None:
+        """Write whatever is queued"""
+        with self._lock:
+            operations, self._operations = self._operations, []
+        if operations:
+            self.tool.bulk_write(operations)
+
+    def close(self) -> None:
+        """Stop the periodic flush and write whatever is queued"""
+        atexit.unregister(self.close)
+        self._closed.set()
+        self.flush()
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                # bulk_write already logged it; keep flushing later batches
+                pass
+
+    def __enter__(self) -> "BufferedMongoWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
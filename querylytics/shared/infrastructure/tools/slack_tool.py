@@ -1,13 +1,39 @@
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, List, Optional
 import logging
+import queue
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Shared so webhook posts reuse a kept-alive TLS connection instead of a new handshake each
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Seconds a webhook post may take; a stalled Slack must not hold up feedback handling
+_TIMEOUT = 5
+# Ceiling for one coalesced post, under Slack's 40,000 character text limit
+_MAX_MESSAGE_BYTES = 35_000
+_SEPARATOR = "\n\n"
+
 class SlackTool:
-    def __init__(self, webhook_url: str, default_channel: str = "#general"):
+    def __init__(
+        self,
+        webhook_url: str,
+        default_channel: str = "#general",
+        flush_interval: float = 0.2,
+        max_pending: int = 1000
+    ):
         self.webhook_url = webhook_url
         self.default_channel = default_channel
+        # send_message_async hands messages to a background sender; messages that
+        # arrive within one flush_interval are posted together, one post per channel
+        self.flush_interval = flush_interval
+        self._pending: "queue.Queue[tuple]" = queue.Queue(maxsize=max_pending)
+        self._sender: Optional[threading.Thread] = None
+        self._sender_lock = threading.Lock()
 
     def send_message(self, message: str, channel: Optional[str] = None) -> bool:
         """
@@ -20,12 +46,73 @@ class SlackTool:
                 "text": message,
                 "mrkdwn": True  # Enable markdown-style formatting
             }
-            
-            response = requests.post(self.webhook_url, json=payload)
+
+            response = _session.post(self.webhook_url, json=payload, timeout=_TIMEOUT)
             response.raise_for_status()
-            
+
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to send Slack message: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+
+    def send_message_async(self, message: str, channel: Optional[str] = None) -> bool:
+        """
+        Queue a message for the background sender and return immediately.
+        Sends synchronously instead when the queue is full.
+        Returns True if the message was queued or sent, False otherwise
+        """
+        self._ensure_sender()
+        try:
+            self._pending.put_nowait((channel or self.default_channel, message))
+            return True
+        except queue.Full:
+            logger.warning("Slack queue full, sending synchronously")
+            return self.send_message(message, channel)
+
+    def _ensure_sender(self) -> None:
+        if self._sender is not None:
+            return
+        with self._sender_lock:
+            if self._sender is None:
+                self._sender = threading.Thread(
+                    target=self._drain, name="slack-sender", daemon=True
+                )
+                self._sender.start()
+
+    def _drain(self) -> None:
+        """Background loop: wait for a message, collect the window's burst, post it"""
+        while True:
+            item = self._pending.get()
+            batch: Dict[str, List[str]] = {}
+            batch.setdefault(item[0], []).append(item[1])
+            # A fixed window from the first message, so a steady stream still gets posted
+            deadline = time.monotonic() + self.flush_interval
+            try:
+                while True:
+                    channel, message = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                    batch.setdefault(channel, []).append(message)
+            except queue.Empty:
+                pass
+            for channel, messages in batch.items():
+                for text in _coalesce(messages):
+                    self.send_message(text, channel)
+
+
+def _coalesce(messages: List[str]) -> Iterator[str]:
+    """Join messages in order into posts of at most _MAX_MESSAGE_BYTES each
+
+    A message that is over the limit by itself is posted on its own, as it
+    would have been without coalescing.
+    """
+    chunk: List[str] = []
+    size = 0
+    for message in messages:
+        length = len(message.encode())
+        if chunk and size + len(_SEPARATOR) + length > _MAX_MESSAGE_BYTES:
+            yield _SEPARATOR.join(chunk)
+            chunk, size = [], 0
+        size += length + (len(_SEPARATOR) if chunk else 0)
+        chunk.append(message)
+    if chunk:
+        yield _SEPARATOR.join(chunk)
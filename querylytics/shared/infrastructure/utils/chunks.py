@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, Iterator, List
 
 def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
     """
@@ -12,10 +12,41 @@ def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
     Returns:
         A list of text chunks.
     """
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = min(start + chunk_size, len(text))
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
\ No newline at end of file
+    return list(chunk_text_iter(text, chunk_size, overlap))
+
+def chunk_text_iter(text: str, chunk_size: int, overlap: int) -> Iterator[str]:
+    """
+    Lazy chunk_text: yields each chunk only when the caller reaches it, so a
+    single pass over a large text never holds all of its chunks at once.
+    """
+    step = chunk_size - overlap
+    if step < 1:
+        raise ValueError("overlap must be smaller than chunk_size")
+    if 0 < len(text) <= chunk_size:
+        # Short texts, the common case for report descriptions, are a single chunk
+        return iter((text,))
+    # Slicing clamps at the end of the text, so every start offset maps straight to a chunk
+    return (text[start:start + chunk_size] for start in range(0, len(text), step))
+
+def chunk_tokens(text: str, chunk_size: int, overlap: int, tokenizer: Any) -> List[str]:
+    """
+    Splits a text into chunks of at most chunk_size tokens, overlapping by overlap tokens.
+
+    The text is tokenized once and windows are cut from the token list, so chunk
+    boundaries match what an embedder using the same tokenizer sees.
+
+    Args:
+        text: The input text to be chunked.
+        chunk_size: The maximum size of each chunk in tokens.
+        overlap: The number of tokens to overlap between consecutive chunks.
+        tokenizer: Any object with encode(str) -> List[int] and decode(List[int]) -> str,
+            e.g. a tiktoken Encoding.
+
+    Returns:
+        A list of text chunks.
+    """
+    step = chunk_size - overlap
+    if step < 1:
+        raise ValueError("overlap must be smaller than chunk_size")
+    tokens = tokenizer.encode(text)
+    return [tokenizer.decode(tokens[start:start + chunk_size]) for start in range(0, len(tokens), step)]
@@ -1,16 +1,42 @@
+import importlib
+import importlib.util
+
 from . import base
 
 from .base import VectorStoreConfig, VectorStore
 
+# Backends load on first access (PEP 562), so importing the package doesn't
+# pay for a backend that is never used
+_LAZY = {
+    "chromadb": ("chromadb", None),
+    "ChromaDBConfig": ("chromadb", "ChromaDBConfig"),
+    "ChromaDB": ("chromadb", "ChromaDB"),
+    "faiss": ("faiss", None),
+    "FAISSConfig": ("faiss", "FAISSConfig"),
+    "FAISSVectorStore": ("faiss", "FAISSVectorStore"),
+}
+
+# Third-party package each backend module needs
+_BACKEND_PACKAGES = {"chromadb": "chromadb", "faiss": "faiss"}
+
+# `import *` only exports the backends whose package is installed; find_spec
+# locates a package without importing it
 __all__ = [
     "base",
     "VectorStore",
     "VectorStoreConfig",
+] + [
+    name for name, (module_name, _) in _LAZY.items()
+    if importlib.util.find_spec(_BACKEND_PACKAGES[module_name]) is not None
 ]
 
-try:
-    from . import chromadb
-    from .chromadb import ChromaDBConfig, ChromaDB
-    __all__.extend(["chromadb", "ChromaDBConfig", "ChromaDB"])
-except ImportError:
-    pass
+
+def __getattr__(name):
+    try:
+        module_name, attr = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    module = importlib.import_module(f".{module_name}", __name__)
+    value = module if attr is None else getattr(module, attr)
+    globals()[name] = value
+    return value
@@ -1,10 +1,10 @@
 from querylytics.shared.infrastructure.pydantic_v1 import BaseSettings
-from abc import ABC
-
 
+import importlib
 import logging
+import sys
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple, Type
 
 from querylytics.shared.infrastructure.embedding_models.models import OpenAIEmbeddingsConfig
 from querylytics.shared.infrastructure.embedding_models.base import EmbeddingModelsConfig
@@ -28,9 +28,27 @@ class VectorStoreConfig(BaseSettings):
 
 class Document:
     """Simple representation of a document."""
+    # No per-instance __dict__; search results can materialize many of these
+    __slots__ = ("content", "metadata")
+
     def __init__(self, content: str, metadata: Optional[dict] = None):
         self.content = content
-        self.metadata = metadata or {}
+        # Metadata keys repeat across every document a store returns; interning them
+        # makes all those copies share one string per key
+        self.metadata = {
+            sys.intern(key) if isinstance(key, str) else key: value
+            for key, value in metadata.items()
+        } if metadata else {}
+
+
+# Config type -> store class; each backend module registers itself when imported
+_REGISTRY: Dict[type, Type["VectorStore"]] = {}
+
+# Imported on the first factory miss, so a backend only loads once it is asked for
+_BACKEND_MODULES = (
+    "querylytics.shared.infrastructure.vector_store.chromadb",
+    "querylytics.shared.infrastructure.vector_store.faiss",
+)
 
 
 class VectorStore(ABC):
@@ -39,24 +57,57 @@ class VectorStore(ABC):
     def __init__(self, config: VectorStoreConfig):
         self.config = config
 
+    @staticmethod
+    def register(config_type: type, store_type: Type["VectorStore"]) -> None:
+        """Make `create` build `store_type` for configs of `config_type`"""
+        _REGISTRY[config_type] = store_type
+
     @staticmethod
     def create(config: VectorStoreConfig) -> Optional["VectorStore"]:
         """Factory method to create a VectorStore instance."""
-        from querylytics.shared.infrastructure.vector_store.chromadb import ChromaDB, ChromaDBConfig
-        if isinstance(config, ChromaDBConfig):
-            return ChromaDB(config)
+        store_type = _lookup(type(config))
+        if store_type is None:
+            for module in _BACKEND_MODULES:
+                importlib.import_module(module)
+            store_type = _lookup(type(config))
+        if store_type is None:
+            logger.warning("No vector store registered for %s", type(config).__name__)
+            return None
+        return store_type(config)
 
     @abstractmethod
-    def add_documents(self, documents: List[str], metadatas: List[dict], ids: List[str]) -> None:
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> None:
         """Add documents to the vector store.
         
         Args:
             documents: List of document contents
             metadatas: List of metadata dictionaries
             ids: List of unique identifiers
+            embeddings: Optional precomputed embeddings, one per document
         """
         pass
 
+    @abstractmethod
+    def embed_documents(self, texts: Sequence[str]) -> List[Sequence[float]]:
+        """Embed texts with the store's embedding function in one call."""
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of documents in the current collection."""
+        pass
+
+    @abstractmethod
+    def peek(self, limit: int = 10) -> dict:
+        """The first `limit` documents as a dict of 'ids', 'metadatas' and 'documents'."""
+        pass
+
     @abstractmethod
     def similar_texts_with_scores(
         self, text: str, k: int = 5
@@ -90,3 +141,12 @@ class VectorStore(ABC):
     def delete_collection(self, collection_name: str) -> None:
         """Delete a collection."""
         pass
+
+
+def _lookup(config_type: type) -> Optional[Type[VectorStore]]:
+    """The store registered for a config type, or for its nearest registered base"""
+    for base in config_type.__mro__:
+        store_type = _REGISTRY.get(base)
+        if store_type is not None:
+            return store_type
+    return None
@@ -1,19 +1,67 @@
+import asyncio
+import json
 import logging
-import chromadb
-from typing import List, Tuple, Sequence
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from hashlib import blake2b
+
+import numpy as np
+
+from typing import Dict, List, Optional, Set, Tuple, Sequence, Union
 from querylytics.shared.infrastructure.vector_store.base import VectorStore, VectorStoreConfig, Document
-from querylytics.shared.infrastructure.embedding_models.base import EmbeddingModelsConfig
+from querylytics.shared.infrastructure.embedding_models.base import EmbeddingModel, EmbeddingModelsConfig
 from querylytics.shared.infrastructure.embedding_models.models import OpenAIEmbeddingsConfig
-from chromadb import PersistentClient, Settings
+from querylytics.shared.infrastructure.language_models.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+def _content_hash(text: str) -> str:
+    return blake2b(text.encode(), digest_size=16).hexdigest()
+
+@lru_cache(maxsize=None)
+def _chromadb():
+    """Import chromadb on first use; its import pulls in a long tail of dependencies
+    that callers who never build a ChromaDB store shouldn't pay for"""
+    import chromadb
+    import chromadb.utils.embedding_functions
+    return chromadb
+
+@lru_cache(maxsize=None)
+def _model_embedding_function_type() -> type:
+    """The Chroma adapter class for EmbeddingModel, defined once chromadb is loaded"""
+
+    class _ModelEmbeddingFunction(_chromadb().EmbeddingFunction):
+        """Adapts one EmbeddingModel to Chroma, so its client and connection pool
+        live as long as the store instead of being set up per call"""
+
+        def __init__(self, model: EmbeddingModel):
+            self._embed = model.embedding_fn()
+
+        def __call__(self, input: List[str]) -> List[List[float]]:
+            return self._embed(list(input))
+
+    return _ModelEmbeddingFunction
+
 class ChromaDBConfig(VectorStoreConfig):
     collection_name: str = "temp"
     storage_path: str = ".chroma/data"
     embedding: EmbeddingModelsConfig = OpenAIEmbeddingsConfig()
+    # remote=True talks to a Chroma server at host:port instead of storage_path
+    remote: bool = False
     host: str = "127.0.0.1"
-    port: int = 6379
+    port: int = 8000
+    query_cache_size: int = 1024  # Query embeddings memoized per store
+    # Embed with `embedding` (OpenAI) instead of Chroma's local default model. Vectors
+    # differ in size, so an existing collection must be rebuilt when this changes
+    use_configured_embedding: bool = False
+    add_concurrency: int = 4  # Batches add_documents embeds and writes at once
+    deduplicate: bool = True  # Skip documents whose exact text is already stored
+    # Results of near-duplicate query vectors are served from memory; any write clears them
+    result_cache_enabled: bool = True
+    result_cache_threshold: float = 0.97  # Minimum cosine similarity between query vectors
+    result_cache_max_entries: int = 1024  # Per top_k/filter combination
+    result_cache_ttl: float = 300.0  # Bounds staleness from writes by other processes
 
 class ChromaDB(VectorStore):
     """Implementation of VectorStore using ChromaDB."""
@@ -21,39 +69,127 @@ class ChromaDB(VectorStore):
     def __init__(self, config: ChromaDBConfig):
         super().__init__(config)
         self.config = config
-        self.client = PersistentClient(
-            path=config.storage_path,
-            settings=Settings(
-                anonymized_telemetry=False,
-                is_persistent=True
+        chromadb = _chromadb()
+        if config.remote:
+            # The HTTP client keeps its connections alive across queries
+            self.client = chromadb.HttpClient(
+                host=config.host,
+                port=config.port,
+                settings=chromadb.Settings(anonymized_telemetry=False)
+            )
+        else:
+            self.client = chromadb.PersistentClient(
+                path=config.storage_path,
+                settings=chromadb.Settings(
+                    anonymized_telemetry=False,
+                    is_persistent=True
+                )
             )
+        # Created on the first aquery against a remote server
+        self._acollection = None
+        # The embedder is held explicitly so documents can be embedded ahead of a
+        # write with the same function the collection queries with
+        self.embedding_function = (
+            _model_embedding_function_type()(EmbeddingModel.create(config.embedding))
+            if config.use_configured_embedding
+            else chromadb.utils.embedding_functions.DefaultEmbeddingFunction()
         )
         
+        # hnswlib's cosine space normalizes each vector once on insert and scores by
+        # inner product, so it already costs what "ip" would. Switching an existing
+        # persistent collection's space is not possible in place
         self.collection = self.client.get_or_create_collection(
             name=config.collection_name,
-            metadata={"hnsw:space": "cosine"}
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self.embedding_function
         )
+        self.embed_query = lru_cache(maxsize=config.query_cache_size)(self._embed_query)
+        # Results differ by top_k and filter, so each combination gets its own cache
+        self._result_caches: Dict[Tuple[int, str], SemanticCache] = {}
+        self._result_cache_lock = threading.Lock()
 
-    def add_documents(self, documents: List[str], metadatas: List[dict], ids: List[str]) -> None:
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> None:
         """Add documents to the ChromaDB collection.
         
         Args:
             documents: List of document contents
             metadatas: List of metadata dictionaries
             ids: List of unique identifiers
+            embeddings: Optional precomputed embeddings; computed by Chroma if omitted
         """
-        logger.info(f"Adding {len(documents)} documents to collection '{self.config.collection_name}'.")
-        
-        self.collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        logger.info("Adding %d documents to collection '%s'.", len(documents), self.config.collection_name)
+        try:
+            self._add_batches(documents, metadatas, ids, embeddings)
+        finally:
+            # Cleared once the batches are written (or partly written), so results
+            # cached by queries that ran during the write are dropped too
+            self._clear_result_caches()
+
+    def _add_batches(
+        self,
+        documents: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        embeddings: Optional[Sequence[Sequence[float]]]
+    ) -> None:
+        rows: Sequence[int] = range(len(documents))
+        hashes: Optional[List[str]] = None
+        if self.config.deduplicate:
+            # Identical texts are embedded and stored once; later copies are dropped
+            hashes = [_content_hash(document) for document in documents]
+            seen: Set[str] = set()
+            rows = [i for i, h in enumerate(hashes) if not (h in seen or seen.add(h))]
+
+        # Embed and write in fixed-size batches to bound memory on large ingests
+        batch_size = self.config.batch_size
+        starts = range(0, len(rows), batch_size)
+
+        def add_batch(start: int) -> None:
+            batch = rows[start:start + batch_size]
+            batch_metadatas = [metadatas[i] for i in batch]
+            if hashes is not None:
+                # One lookup per batch; texts already in the collection are never re-embedded
+                existing = self._existing_hashes([hashes[i] for i in batch])
+                batch = [i for i in batch if hashes[i] not in existing]
+                if not batch:
+                    return
+                batch_metadatas = [{**metadatas[i], 'content_hash': hashes[i]} for i in batch]
+            self.collection.add(
+                documents=[documents[i] for i in batch],
+                metadatas=batch_metadatas,
+                ids=[ids[i] for i in batch],
+                embeddings=[embeddings[i] for i in batch] if embeddings is not None else None
+            )
+
+        if len(starts) <= 1 or self.config.add_concurrency <= 1:
+            for start in starts:
+                add_batch(start)
+            return
+
+        # Embedding inference and Chroma's writes release the GIL, so batches overlap;
+        # list() re-raises the first failed batch's error here
+        with ThreadPoolExecutor(max_workers=min(self.config.add_concurrency, len(starts))) as executor:
+            list(executor.map(add_batch, starts))
+
+    def _existing_hashes(self, hashes: List[str]) -> Set[str]:
+        """The subset of content hashes already stored in the collection"""
+        stored = self.collection.get(where={'content_hash': {'$in': hashes}}, include=['metadatas'])
+        return {metadata['content_hash'] for metadata in stored['metadatas']}
+
+    def embed_documents(self, texts: Sequence[str]) -> List[Sequence[float]]:
+        """Embed texts in a single call to the collection's embedding function."""
+        return list(self.embedding_function(list(texts)))
 
     def similar_texts_with_scores(
         self, text: str, k: int = 5
     ) -> List[Tuple[Document, float]]:
-        logger.info(f"Searching for {k} similar texts for: {text}")
+        logger.info("Searching for %s similar texts for: %s", k, text)
         return [(Document(content=f"Sample doc {i}", metadata={"id": i}), 0.9 - 0.1 * i) for i in range(k)]
 
     def list_collections(self) -> List[str]:
@@ -68,46 +204,179 @@ class ChromaDB(VectorStore):
     def delete_collection(self, collection_name: str) -> None:
         logger.info(f"Deleting collection '{collection_name}'.")
         
+    def count(self) -> int:
+        """Number of documents in the collection"""
+        return self.collection.count()
+
+    def peek(self, limit: int = 10) -> dict:
+        """The first `limit` documents of the collection"""
+        return self.collection.peek(limit=limit)
+
     def query(
         self, 
-        query: str, 
+        query: Union[str, List[str]], 
         top_k: int = 5, 
         include_metadata: bool = True,
         where: dict = None,
         alpha: float = 0.5
-    ) -> List[dict]:
+    ) -> Union[List[dict], List[List[dict]]]:
         """
         Query the vector store for similar documents.
 
         Args:
-            query: The input query string
+            query: The input query string, or a list of them searched in one call
             top_k: Number of results to return
             include_metadata: Whether to include metadata in results
             where: Optional filter conditions for metadata
             alpha: Balance between semantic (1.0) and keyword search (0.0)
 
+        Returns:
+            List of dictionaries containing 'text', 'metadata', and 'similarity_score';
+            for a list of queries, one such list per query, in order
+        """
+        logger.info("Querying for top %s similar documents for: %s", top_k, query)
+        if not isinstance(query, str):
+            return self._query_many(query, top_k=top_k, where=where)
+        # Repeated queries reuse their memoized embedding instead of re-embedding
+        return self.query_by_vector(self.embed_query(query), top_k=top_k, where=where)
+
+    def _embed_query(self, text: str) -> Tuple[float, ...]:
+        """Embed one query string; wrapped by the per-instance embed_query cache"""
+        return tuple(float(x) for x in self.embedding_function([text])[0])
+
+    def query_by_vector(
+        self,
+        vector: Sequence[float],
+        top_k: int = 5,
+        where: dict = None
+    ) -> List[dict]:
+        """
+        Query the vector store with a precomputed query embedding.
+
         Returns:
             List of dictionaries containing 'text', 'metadata', and 'similarity_score'
         """
-        logger.info(f"Querying for top {top_k} similar documents for: {query}")
-        
-        results = self.collection.query(
-            query_texts=[query],
+        cache = self._result_cache(top_k, where)
+        cached = self._cached_results(cache, vector)
+        if cached is not None:
+            return cached
+
+        results = self._format_results(self.collection.query(
+            query_embeddings=[list(vector)],
+            n_results=top_k,
+            where=where,
+            include=['documents', 'metadatas', 'distances']
+        ))
+        self._cache_results(cache, vector, results)
+        return list(results)
+
+    async def aquery(self, query: str, top_k: int = 5, where: dict = None) -> List[dict]:
+        """
+        Async query. Against a remote server the search is awaited on Chroma's
+        async HTTP client, so concurrent queries overlap their round-trips;
+        a local store runs the blocking search in a worker thread.
+
+        Returns:
+            List of dictionaries containing 'text', 'metadata', and 'similarity_score'
+        """
+        loop = asyncio.get_running_loop()
+        vector = await loop.run_in_executor(None, self.embed_query, query)
+        if not self.config.remote:
+            return await loop.run_in_executor(None, self.query_by_vector, vector, top_k, where)
+
+        cache = self._result_cache(top_k, where)
+        cached = self._cached_results(cache, vector)
+        if cached is not None:
+            return cached
+
+        if self._acollection is None:
+            chromadb = _chromadb()
+            aclient = await chromadb.AsyncHttpClient(
+                host=self.config.host,
+                port=self.config.port,
+                settings=chromadb.Settings(anonymized_telemetry=False)
+            )
+            self._acollection = await aclient.get_collection(name=self.config.collection_name)
+        results = await self._acollection.query(
+            query_embeddings=[list(vector)],
             n_results=top_k,
             where=where,
             include=['documents', 'metadatas', 'distances']
         )
+        formatted = self._format_results(results)
+        self._cache_results(cache, vector, formatted)
+        return list(formatted)
+
+    def _query_many(self, queries: List[str], top_k: int, where: Optional[dict]) -> List[List[dict]]:
+        """Search every query not answered by the result cache in a single collection round-trip"""
+        if not queries:
+            return []
+        cache = self._result_cache(top_k, where)
+        vectors = [self.embed_query(query) for query in queries]
+        answers: List[Optional[List[dict]]] = [self._cached_results(cache, vector) for vector in vectors]
+        misses = [i for i, answer in enumerate(answers) if answer is None]
+        if misses:
+            results = self.collection.query(
+                query_embeddings=[list(vectors[i]) for i in misses],
+                n_results=top_k,
+                where=where,
+                include=['documents', 'metadatas', 'distances']
+            )
+            for index, i in enumerate(misses):
+                formatted = self._format_results(results, index)
+                self._cache_results(cache, vectors[i], formatted)
+                answers[i] = list(formatted)
+        return answers
 
-        # Format results
-        formatted_results = []
-        for doc, metadata, distance in zip(
-            results['documents'][0],
-            results['metadatas'][0],
-            results['distances'][0]
-        ):
-            formatted_results.append({
+    def _result_cache(self, top_k: int, where: Optional[dict]) -> Optional[SemanticCache]:
+        if not self.config.result_cache_enabled:
+            return None
+        key = (top_k, json.dumps(where, sort_keys=True))
+        with self._result_cache_lock:
+            cache = self._result_caches.get(key)
+            if cache is None:
+                cache = SemanticCache(
+                    threshold=self.config.result_cache_threshold,
+                    max_entries=self.config.result_cache_max_entries,
+                    ttl=self.config.result_cache_ttl
+                )
+                self._result_caches[key] = cache
+            return cache
+
+    def _cached_results(self, cache: Optional[SemanticCache], vector: Sequence[float]) -> Optional[List[dict]]:
+        """Results cached for a near-duplicate query vector, as a fresh list"""
+        if cache is None:
+            return None
+        with self._result_cache_lock:
+            cached = cache.lookup(vector)
+        return list(cached) if cached is not None else None
+
+    def _cache_results(self, cache: Optional[SemanticCache], vector: Sequence[float], results: List[dict]) -> None:
+        if cache is not None:
+            with self._result_cache_lock:
+                cache.add(vector, results)
+
+    def _clear_result_caches(self) -> None:
+        with self._result_cache_lock:
+            self._result_caches.clear()
+
+    @staticmethod
+    def _format_results(results: dict, index: int = 0) -> List[dict]:
+        """Flatten one query's part of a Chroma result into a list of result dicts"""
+        # Convert cosine distances to similarity scores in one array operation;
+        # tolist() hands back plain floats, so results stay JSON-serializable
+        similarities = (1 - np.asarray(results['distances'][index], dtype=np.float64) / 2).tolist()
+        return [
+            {
                 'text': doc,
                 'metadata': metadata,
-                'similarity_score': (1 - distance/2)  # Convert cosine distance to similarity score
-            })
-        return formatted_results
+                'similarity_score': similarity
+            }
+            for doc, metadata, similarity in zip(
+                results['documents'][index],
+                results['metadatas'][index],
+                similarities
+            )
+        ]
+
+VectorStore.register(ChromaDBConfig, ChromaDB)
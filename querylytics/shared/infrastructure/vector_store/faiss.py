@@ -0,0 +1,238 @@
+import logging
+from functools import lru_cache
+
+import numpy as np
+from typing import List, Optional, Tuple, Sequence
+from querylytics.shared.infrastructure.vector_store.base import VectorStore, VectorStoreConfig, Document
+from querylytics.shared.infrastructure.embedding_models.base import EmbeddingModelsConfig
+from querylytics.shared.infrastructure.embedding_models.models import OpenAIEmbeddingsConfig
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def _faiss():
+    """Import faiss on first use, so importing this module (for FAISSConfig) doesn't
+    load the native library"""
+    try:
+        import faiss
+    except ImportError:
+        raise ImportError(
+            "FAISSVectorStore requires the faiss package; install faiss-cpu to use it."
+        ) from None
+    return faiss
+
+class FAISSConfig(VectorStoreConfig):
+    collection_name: str = "temp"
+    storage_path: str = ""  # The index lives in memory; nothing is written to disk
+    embedding: EmbeddingModelsConfig = OpenAIEmbeddingsConfig()
+    index_type: str = "flat"  # "flat" (exact, IndexFlatIP) or "hnsw" for large corpora
+    hnsw_m: int = 32  # Graph neighbours per node when index_type is "hnsw"
+    # Stored vector precision: "none" (float32), "fp16" or "int8". Lower precision
+    # halves or quarters index memory and the bandwidth each distance computation reads
+    quantization: str = "none"
+    query_cache_size: int = 1024  # Query embeddings memoized per store
+
+class FAISSVectorStore(VectorStore):
+    """Implementation of VectorStore using an in-memory FAISS index.
+
+    Embeddings are L2-normalized before they are added or searched, so the
+    inner product the index computes is the cosine similarity.
+    """
+
+    def __init__(self, config: FAISSConfig):
+        _faiss()  # Fail at construction rather than on the first add
+        super().__init__(config)
+        self.config = config
+        # Same embedder as the ChromaDB store, so either backend ranks alike
+        from chromadb.utils import embedding_functions
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.index = None  # Built on the first add, once the dimension is known
+        # Row i of the index is entry i of these lists
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[dict] = []
+        self.embed_query = lru_cache(maxsize=config.query_cache_size)(self._embed_query)
+
+    def _build_index(self, dims: int):
+        faiss = _faiss()
+        qtype = self._quantizer_type()
+        if self.config.index_type == "hnsw":
+            if qtype is None:
+                return faiss.IndexHNSWFlat(dims, self.config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            return faiss.IndexHNSWSQ(dims, qtype, self.config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        if qtype is None:
+            return faiss.IndexFlatIP(dims)
+        return faiss.IndexScalarQuantizer(dims, qtype, faiss.METRIC_INNER_PRODUCT)
+
+    def _create_index(self, dims: int):
+        index = self._build_index(dims)
+        if not index.is_trained:
+            # Train on [-1, 1], the bounds of any unit-vector component. Training on
+            # the first batch would fit the range to it and clip later vectors
+            bounds = np.stack([np.full(dims, -1.0), np.full(dims, 1.0)]).astype(np.float32)
+            index.train(bounds)
+        return index
+
+    def _quantizer_type(self):
+        faiss = _faiss()
+        quantization = self.config.quantization
+        if quantization == "none":
+            return None
+        if quantization == "fp16":
+            return faiss.ScalarQuantizer.QT_fp16
+        if quantization == "int8":
+            # One value range shared by every dimension, set by the min and max of
+            # the training vectors; see _create_index
+            return faiss.ScalarQuantizer.QT_8bit_uniform
+        raise ValueError(f"Unsupported quantization: {quantization}")
+
+    @staticmethod
+    def _normalized(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+        """Stack vectors into a contiguous float32 matrix with unit-length rows"""
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        _faiss().normalize_L2(matrix)
+        return matrix
+
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> None:
+        """Add documents to the FAISS index.
+
+        Args:
+            documents: List of document contents
+            metadatas: List of metadata dictionaries
+            ids: List of unique identifiers
+            embeddings: Optional precomputed embeddings; computed here if omitted
+        """
+        logger.info("Adding %d documents to collection '%s'.", len(documents), self.config.collection_name)
+        if not documents:
+            return
+        if embeddings is None:
+            embeddings = self.embed_documents(documents)
+
+        vectors = self._normalized(embeddings)
+        if self.index is None:
+            self.index = self._create_index(vectors.shape[1])
+        self.index.add(vectors)
+        self.ids.extend(ids)
+        self.documents.extend(documents)
+        self.metadatas.extend(metadatas)
+
+    def embed_documents(self, texts: Sequence[str]) -> List[Sequence[float]]:
+        """Embed texts in a single call to the store's embedding function."""
+        return list(self.embedding_function(list(texts)))
+
+    def similar_texts_with_scores(
+        self, text: str, k: int = 5
+    ) -> List[Tuple[Document, float]]:
+        return [
+            (Document(content=result['text'], metadata=result['metadata']), result['similarity_score'])
+            for result in self.query(text, top_k=k)
+        ]
+
+    def list_collections(self) -> List[str]:
+        return [self.config.collection_name]
+
+    def create_collection(self, collection_name: str, replace: bool = False) -> None:
+        logger.info("Creating collection '%s' (replace=%s).", collection_name, replace)
+        self.config.collection_name = collection_name
+        self.config.replace_collection = replace
+        if replace:
+            self._reset()
+
+    def delete_collection(self, collection_name: str) -> None:
+        logger.info("Deleting collection '%s'.", collection_name)
+        if collection_name == self.config.collection_name:
+            self._reset()
+
+    def _reset(self) -> None:
+        self.index = None
+        self.ids, self.documents, self.metadatas = [], [], []
+
+    def count(self) -> int:
+        """Number of documents in the index"""
+        return len(self.ids)
+
+    def peek(self, limit: int = 10) -> dict:
+        """The first `limit` documents, shaped like a Chroma get() result"""
+        return {
+            'ids': self.ids[:limit],
+            'metadatas': self.metadatas[:limit],
+            'documents': self.documents[:limit]
+        }
+
+    def query(
+        self,
+        query: str,
+        top_k: int = 5,
+        include_metadata: bool = True,
+        where: dict = None,
+        alpha: float = 0.5
+    ) -> List[dict]:
+        """
+        Query the vector store for similar documents.
+
+        Returns:
+            List of dictionaries containing 'text', 'metadata', and 'similarity_score'
+        """
+        logger.info("Querying for top %s similar documents for: %s", top_k, query)
+        return self.query_by_vector(self.embed_query(query), top_k=top_k, where=where)
+
+    def _embed_query(self, text: str) -> Tuple[float, ...]:
+        """Embed one query string; wrapped by the per-instance embed_query cache"""
+        return tuple(float(x) for x in self.embedding_function([text])[0])
+
+    def query_by_vector(
+        self,
+        vector: Sequence[float],
+        top_k: int = 5,
+        where: dict = None
+    ) -> List[dict]:
+        """
+        Query the vector store with a precomputed query embedding.
+
+        `where` is matched by equality on every key, like a Chroma metadata filter.
+
+        Returns:
+            List of dictionaries containing 'text', 'metadata', and 'similarity_score'
+        """
+        if self.index is None or not self.ids:
+            return []
+
+        faiss = _faiss()
+        params = None
+        if where:
+            # Restrict the search to matching rows instead of over-fetching and filtering
+            rows = [
+                row for row, metadata in enumerate(self.metadatas)
+                if all(metadata.get(key) == value for key, value in where.items())
+            ]
+            if not rows:
+                return []
+            selector = faiss.IDSelectorBatch(np.asarray(rows, dtype=np.int64))
+            # HNSW indexes reject the generic parameter type
+            params = (
+                faiss.SearchParametersHNSW(sel=selector)
+                if self.config.index_type == "hnsw"
+                else faiss.SearchParameters(sel=selector)
+            )
+            top_k = min(top_k, len(rows))
+
+        query = self._normalized([vector])
+        scores, rows = self.index.search(query, min(top_k, len(self.ids)), params=params)
+        return [
+            {
+                'text': self.documents[row],
+                'metadata': self.metadatas[row],
+                # Same (1 + cosine) / 2 scale ChromaDB reports, so score thresholds carry over
+                'similarity_score': (1 + float(score)) / 2
+            }
+            for score, row in zip(scores[0], rows[0])
+            if row != -1
+        ]
+
+VectorStore.register(FAISSConfig, FAISSVectorStore)
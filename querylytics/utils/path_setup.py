@@ -1,5 +1,7 @@
 import sys
-import os
+from pathlib import Path
 
-# Add the project root to the Python path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) 
\ No newline at end of file
+# Make the top-level querylytics package importable when running scripts from this directory
+_ROOT = str(Path(__file__).resolve().parent.parent.parent)
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)